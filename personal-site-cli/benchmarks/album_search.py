@@ -0,0 +1,135 @@
+#! /usr/bin/env python3
+"""
+Micro-benchmark for AlbumSearchIndex on a synthetic album library.  Exits non-zero if the 95th
+percentile query time exceeds the limit, or if too few of the index's best suggestions score as
+well as the best from scoring every album, so it can guard against regressions.
+
+    python benchmarks/album_search.py --albums 10000 --max-p95-ms 50 --min-recall 0.95
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fuzzywuzzy import fuzz  # noqa E402
+
+from utils.album_search import AlbumSearchIndex  # noqa E402
+
+PLACES = [
+    "Paris", "Lisbon", "Porto", "Kyoto", "Tokyo", "Osaka", "Reykjavik", "Buenos Aires", "Bogotá",
+    "Medellín", "Cusco", "Lima", "Mexico City", "Oaxaca", "New York", "Chicago", "Denver",
+    "Yosemite", "Zion", "Banff", "Montréal", "Québec City", "Berlin", "Munich", "Prague",
+    "Vienna", "Budapest", "Kraków", "Istanbul", "Cappadocia", "Athens", "Santorini", "Rome",
+    "Florence", "Venice", "Barcelona", "Madrid", "Sevilla", "Marrakech", "Cape Town",
+]  # fmt: skip
+WORDS = ["Trip", "Day", "Weekend", "Hike", "Food", "Wedding", "Birthday", "Road Trip", "Beach"]
+
+
+def make_albums(n: int, rng: random.Random):
+    albums = []
+    for i in range(n):
+        title = f"{rng.choice(PLACES)} -- {rng.choice(PLACES)} {rng.choice(WORDS)}"
+        if rng.random() < 0.5:
+            title += f" {rng.randint(2010, 2023)}"
+        albums.append({"id": f"album-{i}", "title": title})
+    return albums
+
+
+def make_queries(albums, n: int, rng: random.Random):
+    queries = []
+    for album in rng.sample(albums, n):
+        title = album["title"].lower()
+        # Drop a character or swap two to mimic a typo
+        i = rng.randrange(len(title) - 1)
+        if rng.random() < 0.5:
+            queries.append(title[:i] + title[i + 1 :])
+        else:
+            queries.append(title[:i] + title[i + 1] + title[i] + title[i + 2 :])
+    return queries
+
+
+def full_sort(albums, entry: str, n: int = 5):
+    """
+    The previous implementation, scoring and sorting every album for every query
+    """
+    albums = [(i["title"], i["id"]) for i in albums]
+    return sorted(albums, key=lambda a: -fuzz.token_set_ratio(entry.lower(), a[0].lower()))[:n]
+
+
+def best_score(entry: str, suggestions) -> int:
+    return max((fuzz.token_set_ratio(entry, title) for title, _ in suggestions), default=0)
+
+
+def recall(index: AlbumSearchIndex, albums, queries) -> float:
+    """
+    The share of queries whose best suggestion from the index scores as well as the best from
+    the full sort
+    """
+    hits = sum(
+        best_score(q, index.search(q, 1)) >= best_score(q, full_sort(albums, q, 1)) for q in queries
+    )
+    return hits / len(queries)
+
+
+def time_queries(fn, queries):
+    timings = []
+    for query in queries:
+        started = time.perf_counter()
+        fn(query)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--albums", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--max-p95-ms", type=float, default=50.0)
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    parser.add_argument(
+        "--recall-queries",
+        type=int,
+        default=20,
+        help="How many queries to check against the full sort, which is slow on large libraries",
+    )
+    parser.add_argument(
+        "--compare", action="store_true", help="Also time the full sort over every album"
+    )
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    albums = make_albums(args.albums, rng)
+    queries = make_queries(albums, args.queries, rng)
+
+    started = time.perf_counter()
+    index = AlbumSearchIndex(albums)
+    print(f"Indexed {len(index)} albums in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    timings = time_queries(index.search, queries)
+    p95 = statistics.quantiles(timings, n=20)[-1]
+    print(f"Index:     median {statistics.median(timings):.2f} ms, p95 {p95:.2f} ms")
+
+    if args.compare:
+        baseline = time_queries(lambda q: full_sort(albums, q), queries[:10])
+        print(f"Full sort: median {statistics.median(baseline):.2f} ms")
+
+    hit_rate = recall(index, albums, queries[: args.recall_queries])
+    print(f"Recall:    {hit_rate:.0%} of best suggestions match the full sort")
+
+    failed = False
+    if p95 > args.max_p95_ms:
+        print(f"p95 of {p95:.2f} ms is over the {args.max_p95_ms} ms limit")
+        failed = True
+    if hit_rate < args.min_recall:
+        print(f"Recall of {hit_rate:.0%} is under the {args.min_recall:.0%} minimum")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,41 +1,58 @@
-from typing import List, Set
+import asyncio
+from typing import Any, Dict, List, Set
 from .base_cli import BaseCLI
-from attrs import asdict
+from attrs import asdict, evolve
+from io import BytesIO
 from utils.cli_utils import (
     clr_line,
     cls,
     get_input,
     get_selection,
     print_figlet,
-    print_single_list,
+    select_album,
 )
 from utils.constants import (
     APP_NAME,
 )
-from clients import DDBClient, GooglePhotosClient, S3Client, Namespaces, HomeEntities
-from utils.photo_processing import (
-    IMAGE_TYPE,
-    download_image,
-    hash_buffer_md5,
-    rescale_image,
-    save_image_to_buffer,
+from clients import (
+    AsyncS3Client,
+    DDBBatchWriter,
+    DDBClient,
+    Downloader,
+    GooglePhotosClient,
+    S3Client,
+    Namespaces,
+    HomeEntities,
 )
+from utils.executors import HybridExecutor
+from utils.photo_processing import WEBP_PROFILE
+from utils.media_index import MediaItemIndex
 from utils.navigation import MenuAction
 from models.home import Photo
-from PIL import Image
 
 
 class HomeCLI(BaseCLI):
     PHOTO_PK = f"{Namespaces.HOME}#{HomeEntities.PHOTO}"
     MAX_PHOTO_SIZE = 1024
+    ENCODER_PROFILE = WEBP_PROFILE
+    # Uploads still running while the next photos are downloaded and resized
+    MAX_PENDING_UPLOADS = 8
+    # The Photo fields read back to decide which media items of an album still need syncing
+    SYNC_INDEX_FIELDS = ["photo_id", "filename", "creation_timestamp", "hsh"]
 
     def __init__(
         self,
         google_photos_client: GooglePhotosClient,
         s3_client: S3Client,
         ddb_client: DDBClient,
+        async_s3_client: AsyncS3Client,
+        executor: HybridExecutor,
+        downloader: Downloader,
     ):
         self.s3_client = s3_client
+        self.async_s3_client = async_s3_client
+        self.executor = executor
+        self.downloader = downloader
         self.ddb_client = ddb_client
         self.google_photos_client = google_photos_client
 
@@ -92,64 +109,105 @@ class HomeCLI(BaseCLI):
             "Enter the album name to use the autocomplete functionality",
         )
 
-        # Album information has to be loaded from Google Photos.  If the loading process isn't done, wait for it.
-        if not self.google_photos_client.done:
-            await self.google_photos_client.albums
+        data = select_album(self.google_photos_client, inp)
+        if data is None:
+            cls()
+            return
 
-        print()
-
-        # Fuzzy match input against existing Google Photos albums
-        suggestions = self.google_photos_client.get_album_suggestions(
-            self.google_photos_client.albums.result(), inp, 5
-        )
-
-        print_single_list([sug[0] for sug in suggestions])
+        await self._process_photos(data["id"])
 
-        print()
-        sel = get_selection(0, len(suggestions), []) - 1
-
-        data = self.google_photos_client.get_album_info(suggestions[sel][1])
-        self._process_photos(data["id"])
-
-    def _get_existing_photos(self) -> Set[str]:
+    def _get_existing_photos(self) -> List[Dict[str, Any]]:
         """
-        A method for getting the existing Home page photos
+        A method for getting the fields of the existing Home page photos needed
+        to tell whether a photo has already been synced
         """
-        existing = self.ddb_client.get_equals(self.PHOTO_PK)
-        return set([image["hsh"] for image in existing])
+        return list(
+            self.ddb_client.iter_equals(
+                self.PHOTO_PK,
+                attributes=[f"{DDBClient.ENTITY}.{name}" for name in self.SYNC_INDEX_FIELDS],
+            )
+        )
 
-    def _process_photos(self, album_id: str) -> None:
+    async def _process_photos(self, album_id: str) -> None:
         """
         A method for retrieving a photo list from GP, downloading/editing the
-        photos, uploading them to S3 and writing the info to DDB
+        photos, uploading them to S3 and writing the info to DDB.  Downloads and
+        image work run off the event loop and each photo's upload overlaps the
+        next download.
         """
         print_figlet(APP_NAME)
-        photos = self.google_photos_client.get_album_photos(album_id)
-
-        existing = self._get_existing_photos()
-
-        for i, obj in enumerate(photos):
-            print(f"Uploading Photo: {i + 1} out of {len(photos)}")
-            img: Image.Image = download_image(obj["baseUrl"] + "=d")
-            img = rescale_image(img, self.MAX_PHOTO_SIZE)
-            buffer = save_image_to_buffer(img)
-            hsh = hash_buffer_md5(buffer)
-            if hsh in existing:
-                clr_line()
-                continue
-
-            file_path = f"{Namespaces.HOME}/{hsh}.{IMAGE_TYPE}"
-            s3_path = self.s3_client.write_image_to_s3(
-                file_path, buffer, ACL="public-read", ContentType=f"image/{IMAGE_TYPE}"
-            )
-
-            photo = Photo(
-                photo_id=obj["id"],
-                src=s3_path,
-                height=img.height,
-                width=img.width,
-                creation_timestamp=obj["mediaMetadata"]["creationTime"],
-                hsh=hsh,
-            )
-            self.ddb_client.put(self.PHOTO_PK, hsh, asdict(photo))
-            clr_line()
+        existing_photos = self._get_existing_photos()
+        # Media items that already have a Photo record are dropped before anything is downloaded
+        index = MediaItemIndex(existing_photos)
+
+        existing = set(photo["hsh"] for photo in existing_photos)
+
+        # The album is listed a page at a time on the I/O threads, each page is listed while the
+        # one before it is being processed
+        pages = self.google_photos_client.iter_album_photo_pages(album_id)
+        next_page = self.executor.submit_io(next, pages, None)
+
+        count = 0
+        uploads: Set[asyncio.Future] = set()
+        with self.ddb_client.batch_writer(limiter=self.executor.write_limiter) as writer:
+            while (page := await asyncio.wrap_future(next_page)) is not None:
+                next_page = self.executor.submit_io(next, pages, None)
+                for obj in index.missing(page):
+                    count += 1
+                    print(f"Uploading Photo: {count}")
+                    original = await asyncio.wrap_future(
+                        self.executor.submit_io(
+                            self.executor.download_limiter.call,
+                            self.downloader.download,
+                            self.google_photos_client.get_download_url(obj, self.MAX_PHOTO_SIZE),
+                        )
+                    )
+                    with original:
+                        renditions = await asyncio.wrap_future(
+                            self.executor.submit_render(
+                                original, [self.MAX_PHOTO_SIZE], self.ENCODER_PROFILE
+                            )
+                        )
+                    rendition = renditions[self.MAX_PHOTO_SIZE]
+                    hsh = rendition.hsh
+                    if hsh in existing:
+                        clr_line()
+                        continue
+                    # The same photo can appear in an album twice, only upload it once
+                    existing.add(hsh)
+
+                    if len(uploads) >= self.MAX_PENDING_UPLOADS:
+                        done, uploads = await asyncio.wait(
+                            uploads, return_when=asyncio.FIRST_COMPLETED
+                        )
+                        for upload in done:
+                            upload.result()
+
+                    photo = Photo(
+                        photo_id=obj["id"],
+                        src="",
+                        height=rendition.height,
+                        width=rendition.width,
+                        creation_timestamp=obj["mediaMetadata"]["creationTime"],
+                        hsh=hsh,
+                        filename=obj.get("filename", ""),
+                    )
+                    uploads.add(
+                        asyncio.ensure_future(self._upload_photo(photo, rendition.buffer, writer))
+                    )
+                    clr_line()
+
+            await asyncio.gather(*uploads)
+
+    async def _upload_photo(self, photo: Photo, buffer: BytesIO, writer: DDBBatchWriter) -> None:
+        """
+        A method for uploading a photo to S3 and then recording it in DDB
+        """
+        file_path = f"{Namespaces.HOME}/{photo.hsh}.{self.ENCODER_PROFILE.extension}"
+        s3_path = await self.async_s3_client.write_image_to_s3(
+            file_path,
+            buffer,
+            content_type=self.ENCODER_PROFILE.content_type,
+            ACL="public-read",
+        )
+        writer.put(self.PHOTO_PK, photo.hsh, asdict(evolve(photo, src=s3_path)))
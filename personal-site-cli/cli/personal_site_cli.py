@@ -1,4 +1,13 @@
-from clients import DDBClient, GoogleMapsClient, GooglePhotosClient, S3Client
+from clients import (
+    AsyncDDBClient,
+    AsyncS3Client,
+    DDBClient,
+    Downloader,
+    GoogleMapsClient,
+    GooglePhotosClient,
+    S3Client,
+)
+from utils.executors import HybridExecutor
 from utils.cli_utils import cls, get_selection, print_figlet
 from utils.constants import APP_NAME
 
@@ -15,18 +24,32 @@ class PersonalSiteCLI(BaseCLI):
         google_photos_client: GooglePhotosClient,
         s3_client: S3Client,
         ddb_client: DDBClient,
+        async_s3_client: AsyncS3Client,
+        async_ddb_client: AsyncDDBClient,
+        executor: HybridExecutor,
+        downloader: Downloader,
     ):
         self.gp = google_photos_client
         self.gm = google_maps_client
         self.s3 = s3_client
         self.dynamo = ddb_client
+        self.async_s3 = async_s3_client
+        self.async_dynamo = async_ddb_client
 
-        self._menu_options = ["Travel", "Resume", "Home"]
+        self._menu_options = ["Travel", "Resume", "Home", "Refresh Google Photos Albums"]
         self._travel_cli = TravelCLI(
-            google_maps_client, google_photos_client, s3_client, ddb_client
+            google_maps_client,
+            google_photos_client,
+            s3_client,
+            ddb_client,
+            async_ddb_client,
+            executor,
+            downloader,
+        )
+        self._resume_cli = ResumeCLI(s3_client, ddb_client, downloader)
+        self._home_cli = HomeCLI(
+            google_photos_client, s3_client, ddb_client, async_s3_client, executor, downloader
         )
-        self._resume_cli = ResumeCLI(s3_client, ddb_client)
-        self._home_cli = HomeCLI(google_photos_client, s3_client, ddb_client)
 
         self._run = False
 
@@ -55,11 +78,12 @@ class PersonalSiteCLI(BaseCLI):
 
             if sel == 0:
                 self._run = False
-                if not self.gp.done:
-                    self.gp.albums.cancel()
             elif sel == 1:
                 await self._travel_cli.run()
             elif sel == 2:
                 await self._resume_cli.run()
             elif sel == 3:
                 await self._home_cli.run()
+            elif sel == 4:
+                # Lists every album again, rather than stopping at the albums already catalogued
+                self.gp.refresh_albums(full=True)
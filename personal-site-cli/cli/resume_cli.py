@@ -3,12 +3,12 @@ from typing import Any, Dict, List
 
 from attr import fields_dict
 
-from clients import DDBClient, Namespaces, ResumeEntities, S3Client
+from clients import DDBClient, Downloader, Namespaces, ResumeEntities, S3Client
 from models.resume import Education, Job, Skill
 from utils.cli_utils import cls, get_input, get_selection, print_figlet
 from utils.constants import APP_NAME
 from utils.navigation import MenuAction
-from utils.photo_processing import IMAGE_TYPE, download_image, hash_buffer_md5, save_image_to_buffer
+from utils.photo_processing import PNG_PROFILE, hash_buffer_md5, save_image_to_buffer
 
 from .base_cli import BaseCLI
 
@@ -17,14 +17,18 @@ class ResumeCLI(BaseCLI):
     JOB_PK = f"{Namespaces.RESUME}#{ResumeEntities.JOB}"
     EDUCATION_PK = f"{Namespaces.RESUME}#{ResumeEntities.EDUCATION}"
     SKILL_PK = f"{Namespaces.RESUME}#{ResumeEntities.SKILL}"
+    # Resume images are logos, which stay lossless
+    ENCODER_PROFILE = PNG_PROFILE
 
     def __init__(
         self,
         s3_client: S3Client,
         ddb_client: DDBClient,
+        downloader: Downloader,
     ):
         self.s3_client = s3_client
         self.ddb_client = ddb_client
+        self.downloader = downloader
 
         self._run = False
         self._menu_actions: List[MenuAction] = [
@@ -69,14 +73,14 @@ class ResumeCLI(BaseCLI):
             action.command()
 
     def _download_image(self, prompt: str) -> str:
-        img = download_image(get_input(prompt))
-        buffer = save_image_to_buffer(img)
+        img = self.downloader.download_image(get_input(prompt))
+        buffer = save_image_to_buffer(img, self.ENCODER_PROFILE)
         hsh = hash_buffer_md5(buffer)
-        file_name = f"{hsh}.{IMAGE_TYPE}"
+        file_name = f"{hsh}.{self.ENCODER_PROFILE.extension}"
         file_path = f"resume/images/{file_name}"
 
         s3_path = self.s3_client.write_image_to_s3(
-            file_path, buffer, ACL="public-read", ContentType="image/png"
+            file_path, buffer, content_type=self.ENCODER_PROFILE.content_type, ACL="public-read"
         )
         return s3_path
 
@@ -1,17 +1,23 @@
-from typing import List, Optional, Set, Tuple
+import asyncio
+from concurrent.futures import Future
+from functools import partial
+from itertools import chain
+from typing import Any, Dict, List, Optional, Set
 
 from clients import (
+    AsyncDDBClient,
+    DDBBatchWriter,
     DDBClient,
+    Downloader,
     GoogleMapsClient,
     GooglePhotosClient,
     Namespaces,
     S3Client,
     TravelEntities,
 )
-from exceptions import InvalidStateException
+from exceptions import InvalidStateException, ItemAlreadyExistsException
 from models.google_maps import GeocodedDestination, GeocodedPlace
-from models.travel import Album, Destination, Photo, Place
-from PIL import Image
+from models.travel import Album, Destination, DestinationTree, Photo, Place
 from utils.cli_utils import (
     ask_yes_no_question,
     clr_line,
@@ -22,21 +28,20 @@ from utils.cli_utils import (
     print_double_list,
     print_figlet,
     print_single_list,
+    select_album,
 )
 from utils.constants import APP_NAME
+from utils.media_index import MediaItemIndex
 from utils.navigation import MenuAction, MenuNavigationCodes, MenuNavigationUserCommands
 from utils.photo_processing import (
-    IMAGE_TYPE,
     PHOTO_MAX_SIZE,
     THUMBNAIL_MAX_SIZE,
-    download_image,
-    hash_buffer_md5,
-    rescale_image,
-    save_image_to_buffer,
+    WEBP_PROFILE,
+    Rendition,
+    estimate_decoded_bytes,
 )
-from utils.threading import split, THREADS
-
-from threading import Thread
+from utils.executors import HybridExecutor
+from utils.threading import ClaimSet, WorkerPool
 
 from .base_cli import BaseCLI
 
@@ -52,19 +57,47 @@ class TravelCLI(BaseCLI):
     PHOTO_SK_FS = "{place_id}#{photo_id}"
     ALBUM_SK_FS = "{place_id}#{album_id}"
 
+    # Item collection layout: a Destination and everything under it share one partition, so a
+    # single query returns the whole subtree.  The per-entity partitions above are still what the
+    # site reads, so every write goes to both.
+    COLLECTION_PK_FS = f"{Namespaces.TRAVEL}#{{destination_id}}"
+    COLLECTION_DESTINATION_SK = TravelEntities.DESTINATION
+    COLLECTION_PLACE_SK_FS = f"{TravelEntities.PLACE}#{{place_id}}"
+    COLLECTION_ALBUM_SK_FS = f"{TravelEntities.ALBUM}#{{place_id}}#{{album_id}}"
+    COLLECTION_PHOTO_SK_FS = f"{TravelEntities.PHOTO}#{{place_id}}#{{photo_id}}"
+    # Marks a collection holding every record of its Destination, i.e. it was migrated or the
+    # Destination was created after collections were.  Other collections only hold the records
+    # written since, so they can't be read in place of the per-entity partitions.
+    COLLECTION_COMPLETE_SK = "COMPLETE"
+
+    # The Photo fields read back to decide which media items of an album still need syncing
+    SYNC_INDEX_FIELDS = ["photo_id", "filename", "creation_timestamp", "hsh"]
+
+    # Every photo is rendered at each of these max sizes for the site's srcset.  The largest is the
+    # photo itself and THUMBNAIL_MAX_SIZE is its thumbnail, so both must be in the list.
+    RENDITION_SIZES = [PHOTO_MAX_SIZE, 1024, THUMBNAIL_MAX_SIZE]
+    ENCODER_PROFILE = WEBP_PROFILE
+
     def __init__(
         self,
         google_maps_client: GoogleMapsClient,
         google_photos_client: GooglePhotosClient,
         s3_client: S3Client,
         ddb_client: DDBClient,
+        async_ddb_client: AsyncDDBClient,
+        executor: HybridExecutor,
+        downloader: Downloader,
     ):
         self.google_maps_client = google_maps_client
         self.google_photos_client = google_photos_client
         self.s3_client = s3_client
         self.ddb_client = ddb_client
+        self.async_ddb_client = async_ddb_client
+        self.executor = executor
+        self.downloader = downloader
 
         self._run = False
+        self._prefetch: Optional[Future] = None
         self._menu_actions: List[MenuAction] = [
             MenuAction("Add Destination", self.add_destination),
             MenuAction("Add Place", self.add_place, is_async=True),
@@ -100,6 +133,12 @@ class TravelCLI(BaseCLI):
         """
         self._run = True
 
+        # Almost every action starts by listing the Destinations, so warm the query cache while
+        # the menu is waiting on the user.  Reading the menu selection blocks the event loop, so
+        # the query runs on an I/O thread rather than as a task.
+        if not self._prefetch or self._prefetch.done():
+            self._prefetch = self.executor.submit_io(self._prefetch_destinations)
+
         while self._run:
             self._print_menu()
             sel = get_selection(0, len(self._menu_actions), allowed_chars=[])
@@ -114,6 +153,13 @@ class TravelCLI(BaseCLI):
             else:
                 action.command()
 
+    def _prefetch_destinations(self) -> None:
+        try:
+            self.ddb_client.get_equals(self.DESTINATION_PK)
+        except Exception:
+            # Nothing was cached, so the menu action will run the query itself and surface the error
+            pass
+
     def _get_destinations(self) -> List[Destination]:
         """
         A method for retrieving all Destinations
@@ -132,11 +178,52 @@ class TravelCLI(BaseCLI):
         places.sort(key=lambda x: x.name)
         return places
 
-    def _get_album(self, place: Place) -> Album:
+    def _get_destination_tree(self, destination: Destination) -> DestinationTree:
+        """
+        A method for retrieving a Destination with all of its Places, Albums and Photos using a
+        single query against its item collection
+        """
+        subtree = self.ddb_client.get_subtree(
+            self.COLLECTION_PK_FS.format(destination_id=destination.place_id)
+        )
+        destinations = subtree.get(TravelEntities.DESTINATION, [])
+
+        return DestinationTree(
+            destination=Destination(**destinations[0]) if destinations else None,
+            places=[Place(**obj) for obj in subtree.get(TravelEntities.PLACE, [])],
+            albums=[Album(**obj) for obj in subtree.get(TravelEntities.ALBUM, [])],
+            photos=[Photo(**obj) for obj in subtree.get(TravelEntities.PHOTO, [])],
+            complete=bool(subtree.get(self.COLLECTION_COMPLETE_SK)),
+        )
+
+    def _put_collection_copy(
+        self,
+        destination_id: str,
+        sk: str,
+        entity: Dict[str, Any],
+        writer: Optional[DDBBatchWriter] = None,
+    ) -> None:
+        pk = self.COLLECTION_PK_FS.format(destination_id=destination_id)
+        if writer:
+            writer.put(pk, sk, entity)
+        else:
+            self.ddb_client.put(pk, sk, entity)
+
+    def _delete_collection_copy(self, destination_id: str, sk: str) -> None:
+        self.ddb_client.delete(
+            pk=self.COLLECTION_PK_FS.format(destination_id=destination_id), sk=sk
+        )
+
+    def _get_album(self, place: Place, albums: Optional[List[Album]] = None) -> Album:
         """
-        A method for retrieving the album of a place
+        A method for retrieving the album of a place, either from DynamoDB or from a list of
+        already loaded albums
         """
-        query_result = self.ddb_client.get_begins_with(self.ALBUM_PK, place.place_id)
+        if albums is None:
+            query_result = self.ddb_client.get_begins_with(self.ALBUM_PK, place.place_id)
+        else:
+            query_result = [album.asdict() for album in albums]
+
         if len(query_result) > 1:
             raise InvalidStateException(
                 f"More than one album exists for Place: {place.place_id} under Destination: {place.destination_id}"
@@ -211,16 +298,7 @@ class TravelCLI(BaseCLI):
 
         destination = Destination(place_id=id_, **geocoded_destination.asdict())
 
-        # Check if a record for the Destination already exists
-        record = self.ddb_client.get_equals(self.DESTINATION_PK, destination.place_id)
-
-        # If a record already exists for the Destination, ensure the user wants to continue
-        if record and not ask_yes_no_question(
-            f"A record already exists for destination: {destination.place_id}, continue?: "
-        ):
-            return
-
-        self.edit_destination(destination)
+        self.edit_destination(destination, create=True)
 
         return
 
@@ -304,20 +382,9 @@ class TravelCLI(BaseCLI):
             city=destination.name,
         )
 
-        # Check if a record for the place already exists
-        record = self.ddb_client.get_equals(
-            self.PLACE_PK,
-            self.PLACE_SK_FS.format(destination_id=place.destination_id, place_id=place.place_id),
-        )
-
-        # If a record already exists for the Destination, ensure the user wants to continue
-        if record and not ask_yes_no_question(
-            f"A record already exists for place: {place.place_id}, continue?"
-        ):
+        if not self.edit_place(destination, place, create=True):
             return
 
-        self.edit_place(destination, place)
-
         print_figlet(APP_NAME)
         if ask_yes_no_question("Would you like to add an album to this place? (y/n): "):
             await self.add_album(destination=destination, place=place)
@@ -388,23 +455,10 @@ class TravelCLI(BaseCLI):
             f"{destination.name} -- {place.name}",
         )
 
-        # Album information has to be loaded from Google Photos.  If the loading process isn't done, wait for it.
-        if not self.google_photos_client.done:
-            await self.google_photos_client.albums
-
-        print()
-
-        # Fuzzy match input against existing Google Photos albums
-        suggestions = self.google_photos_client.get_album_suggestions(
-            self.google_photos_client.albums.result(), inp, 5
-        )
-
-        print_single_list([sug[0] for sug in suggestions])
-
-        print()
-        sel = get_selection(0, len(suggestions), []) - 1
-
-        data = self.google_photos_client.get_album_info(suggestions[sel][1])
+        data = select_album(self.google_photos_client, inp)
+        if data is None:
+            cls()
+            return
 
         album = Album(
             album_id=data["id"],
@@ -413,16 +467,28 @@ class TravelCLI(BaseCLI):
             place_id=place.place_id,
         )
 
-        self.ddb_client.put(
-            self.ALBUM_PK,
-            self.ALBUM_SK_FS.format(place_id=place.place_id, album_id=album.album_id),
-            album.asdict(),
+        # The new Album's records and the deletes of the Albums it replaces are independent, so
+        # they're sent concurrently rather than one round trip after another
+        await asyncio.gather(
+            self.async_ddb_client.put(
+                self.ALBUM_PK,
+                self.ALBUM_SK_FS.format(place_id=place.place_id, album_id=album.album_id),
+                album.asdict(),
+            ),
+            self.async_ddb_client.put(
+                self.COLLECTION_PK_FS.format(destination_id=destination.place_id),
+                self.COLLECTION_ALBUM_SK_FS.format(
+                    place_id=place.place_id, album_id=album.album_id
+                ),
+                album.asdict(),
+            ),
+            *[
+                self._delete_existing_album(existing)
+                for existing in existing_albums
+                if existing.album_id != album.album_id
+            ],
         )
 
-        if existing_albums:
-            for album in existing_albums:
-                self._delete_existing_album(album)
-
         print_figlet(APP_NAME)
         if ask_yes_no_question("Would you like to add photos to this album? (y/n): "):
             self.add_photos(destination=destination, place=place)
@@ -433,10 +499,18 @@ class TravelCLI(BaseCLI):
             for album in self.ddb_client.get_begins_with(self.ALBUM_PK, place.place_id)
         ]
 
-    def _delete_existing_album(self, album: Album) -> None:
-        self.ddb_client.delete(
-            pk=self.ALBUM_PK,
-            sk=self.ALBUM_SK_FS.format(place_id=album.place_id, album_id=album.album_id),
+    async def _delete_existing_album(self, album: Album) -> None:
+        await asyncio.gather(
+            self.async_ddb_client.delete(
+                pk=self.ALBUM_PK,
+                sk=self.ALBUM_SK_FS.format(place_id=album.place_id, album_id=album.album_id),
+            ),
+            self.async_ddb_client.delete(
+                pk=self.COLLECTION_PK_FS.format(destination_id=album.destination_id),
+                sk=self.COLLECTION_ALBUM_SK_FS.format(
+                    place_id=album.place_id, album_id=album.album_id
+                ),
+            ),
         )
 
     def add_photos(self, destination: Destination = None, place: Place = None) -> None:
@@ -492,8 +566,7 @@ class TravelCLI(BaseCLI):
                 self.add_photos()
                 return
             elif sel == MenuNavigationCodes.ALL:
-                for place in places:
-                    self._process_photos(destination, place)
+                self._process_all_photos(destination, places)
                 return
             else:
                 place = places[sel - 1]
@@ -506,104 +579,256 @@ class TravelCLI(BaseCLI):
         ):
             self.add_photos(destination=destination)
 
-    def _get_existing_photos(self, place: Place) -> Set[str]:
-        existing = self.ddb_client.get_begins_with(self.PHOTO_PK, place.place_id)
-        return set([image["hsh"] for image in existing])
+    def _get_existing_photos(self, place: Place) -> List[Dict[str, Any]]:
+        """
+        A method for retrieving just the fields of a Place's photos needed to tell whether a
+        photo has already been synced
+        """
+        return list(
+            self.ddb_client.iter_begins_with(
+                self.PHOTO_PK,
+                place.place_id,
+                attributes=[f"{DDBClient.ENTITY}.{name}" for name in self.SYNC_INDEX_FIELDS],
+            )
+        )
+
+    def _process_all_photos(self, destination: Destination, places: List[Place]) -> None:
+        """
+        A method for processing the photos of every Place in a Destination.  The albums and
+        existing photos of all the Places are loaded with one query when the Destination's item
+        collection is complete, rather than two queries per Place.
+        """
+        tree = self._get_destination_tree(destination)
+        for place in places:
+            if not tree.complete:
+                self._process_photos(destination, place)
+            else:
+                self._process_photos(
+                    destination,
+                    place,
+                    album=self._get_album(place, tree.albums_for(place)),
+                    existing=[photo.asdict() for photo in tree.photos_for(place)],
+                )
 
-    def _process_photos(self, destination: Destination, place: Place) -> None:
+    def _process_photos(
+        self,
+        destination: Destination,
+        place: Place,
+        album: Optional[Album] = None,
+        existing: Optional[List[Dict[str, Any]]] = None,
+    ) -> None:
         print_figlet(APP_NAME)
-        album = self._get_album(place)
-        photos = self.google_photos_client.get_album_photos(album.album_id)
+        if album is None:
+            album = self._get_album(place)
+
+        if existing is None:
+            existing = self._get_existing_photos(place)
+        # Media items that already have a Photo record are dropped before anything is downloaded
+        index = MediaItemIndex(existing)
+        pages = (
+            index.missing(page)
+            for page in self.google_photos_client.iter_album_photo_pages(album.album_id)
+        )
+        # Listing stops at the first page with anything to sync, the rest of the album is listed
+        # while that page is being processed
+        photos = next((page for page in pages if page), None)
+        if photos is None:
+            return
 
-        existing = self._get_existing_photos(place)
-        chunks = split(photos, THREADS)
+        hashes = ClaimSet(photo["hsh"] for photo in existing)
+        uploaded = self._get_uploaded_keys(destination, place)
 
-        progress = {}
-        threads = []
-        for i, chunk in enumerate(chunks):
-            thread = Thread(
-                target=self._process_photo, args=(chunk, destination, place, existing, i, progress)
+        # Photo records are buffered and written 25 at a time, rather than one call per photo
+        writer = self.ddb_client.batch_writer(limiter=self.executor.write_limiter)
+        write_error: Optional[Exception] = None
+        try:
+            pool = self.executor.worker_pool(
+                partial(self._process_photo, destination, place, hashes, uploaded, writer),
+                on_progress=self._print_photo_progress,
             )
-            threads.append(thread)
-            thread.start()
-
-        for thread in threads:
-            thread.join()
-
-    def _process_photo(self, chunk, destination, place, existing, thread_no, progress):
-        for i, obj in enumerate(chunk):
-            img: Image.Image = download_image(
-                obj["baseUrl"] + "=d"
-            )  # The =d is needed to download the photo
-            photo_src, hsh, width, height = self._upload_photo_to_s3(img, destination, place)
+            # Photos are queued as their page is listed, so the workers start on the first page
+            # while the later ones are still being listed
+            results = pool.map(chain(photos, chain.from_iterable(pages)))
+        finally:
+            try:
+                writer.close()
+            except Exception as e:
+                # The records that couldn't be written are reported with the photos that failed
+                if not writer.unwritten:
+                    raise
+                write_error = e
+
+        if failed := [result for result in results if not result.ok]:
+            print(f"{len(failed)} photo(s) failed and will be retried on the next sync:")
+            for result in failed:
+                print(f"  {result.item.get('filename', result.item['id'])}: {result.error}")
+        if write_error:
+            print(
+                f"{len(writer.unwritten)} photo record(s) couldn't be written and will be retried "
+                f"on the next sync: {write_error}"
+            )
+        if failed or write_error:
+            get_input("Press enter to continue", "")
 
-            if hsh in existing:
-                continue
+    def _get_uploaded_keys(self, destination: Destination, place: Place) -> Set[str]:
+        """
+        A method for listing the photos and thumbnails of a Place that are already in S3, e.g.
+        from a run that stopped before recording them, with one listing per prefix instead of a
+        HEAD request per photo
+        """
+        return self.s3_client.list_existing_keys(
+            self.s3_client.generate_s3_path_for_image(destination.place_id, place.place_id, "")
+        ) | self.s3_client.list_existing_keys(
+            self.s3_client.generate_s3_path_for_thumbnail(destination.place_id, place.place_id, "")
+        )
 
-            thumbnail_src = self._upload_thumbnail_to_s3(img, destination, place)
+    def _process_photo(
+        self,
+        destination: Destination,
+        place: Place,
+        hashes: ClaimSet,
+        uploaded: Set[str],
+        writer: DDBBatchWriter,
+        obj: Dict[str, Any],
+    ) -> None:
+        """
+        A method for running a photo through the pipeline stages: download -> render -> hash ->
+        dedup check -> upload -> record.  Photos whose hash is already recorded stop before
+        anything is sent to S3.
+        """
+        max_size = max(self.RENDITION_SIZES)
+        decoded_bytes = estimate_decoded_bytes(
+            int(obj["mediaMetadata"]["width"]),
+            int(obj["mediaMetadata"]["height"]),
+            None if self.google_photos_client.download_originals else max_size,
+        )
+        # The photo's memory is reserved until its renditions are encoded, after which only the
+        # much smaller encoded buffers are held while they're uploaded
+        with self.executor.memory_budget.reserve(decoded_bytes):
+            with self.executor.download_limiter.call(
+                self.downloader.download, self.google_photos_client.get_download_url(obj, max_size)
+            ) as original:
+                # Decoding, resizing, encoding and hashing run in a worker process
+                renditions = self.executor.render(
+                    original, self.RENDITION_SIZES, self.ENCODER_PROFILE
+                )
+        full = renditions[max_size]
+
+        # Another thread may be holding the same photo, e.g. when it's in the album twice, only
+        # the first to claim its hash uploads and records it
+        if hashes.claim(full.hsh):
+            srcset = {
+                str(size): self._upload_rendition_to_s3(rendition, destination, place, uploaded)
+                for size, rendition in renditions.items()
+            }
             photo = Photo(
                 photo_id=obj["id"],
-                src=photo_src,
+                src=srcset[str(full.max_size)],
                 destination_id=destination.place_id,
                 place_id=place.place_id,
-                height=height,
-                width=width,
+                height=full.height,
+                width=full.width,
                 creation_timestamp=obj["mediaMetadata"]["creationTime"],
-                hsh=hsh,
-                thumbnail_src=thumbnail_src,
+                hsh=full.hsh,
+                thumbnail_src=srcset[str(THUMBNAIL_MAX_SIZE)],
+                filename=obj.get("filename", ""),
+                srcset=srcset,
             )
-            self.ddb_client.put(
+            writer.put(
                 self.PHOTO_PK,
                 self.PHOTO_SK_FS.format(place_id=place.place_id, photo_id=photo.photo_id),
                 photo.asdict(),
             )
-            progress[thread_no] = 100 * ((i + 1) / len(chunk))
-
-            self._print_photo_progress(progress)
+            self._put_collection_copy(
+                destination.place_id,
+                self.COLLECTION_PHOTO_SK_FS.format(
+                    place_id=place.place_id, photo_id=photo.photo_id
+                ),
+                photo.asdict(),
+                writer=writer,
+            )
 
-    def _print_photo_progress(self, progress):
+    def _print_photo_progress(self, pool: WorkerPool) -> None:
         print_figlet(APP_NAME)
-        print(f"Downloading photos using {THREADS} threads, see progress below...")
-        print(" ".join([f"{k}: {v:.2f}%" for k, v in sorted(progress.items())]))
-
-    def _upload_photo_to_s3(
-        self, img: Image.Image, destination: Destination, place: Place
-    ) -> Tuple[str, str, int, int]:
-        img = rescale_image(img, PHOTO_MAX_SIZE)
-        buffer = save_image_to_buffer(img)
-        hsh = hash_buffer_md5(buffer)
-        file_name = f"{hsh}.{IMAGE_TYPE}"
-        file_path = self.s3_client.generate_s3_path_for_image(
-            destination.place_id, place.place_id, file_name
+        print(
+            f"Syncing photos using {pool.workers} threads and "
+            f"{self.executor.cpu_workers} processes, see progress below..."
         )
+        print(f"{pool.completed} of {pool.total} done, {pool.failed} failed")
+        budget = self.executor.memory_budget
+        print(f"memory: {budget.in_use // 2**20} of {budget.capacity // 2**20} MB reserved")
+        for limiter in self.executor.limiters:
+            stats = limiter.stats()
+            print(
+                f"{stats['name']}: {stats['in_flight']} of {stats['limit']} running, "
+                f"throttled {stats['throttled']} times"
+            )
+        for obj in pool.in_flight().values():
+            print(f"  {obj.get('filename', obj['id'])}")
 
-        s3_path = self.s3_client.write_image_to_s3(
-            file_path, buffer, ACL="public-read", ContentType=f"image/{IMAGE_TYPE}"
+    def _get_rendition_path(
+        self, rendition: Rendition, destination: Destination, place: Place
+    ) -> str:
+        """
+        A method for choosing where a rendition is stored.  The largest rendition and the
+        thumbnail keep their original locations, the sizes in between go in per-size folders.
+        """
+        file_name = f"{rendition.hsh}.{self.ENCODER_PROFILE.extension}"
+        if rendition.max_size == max(self.RENDITION_SIZES):
+            return self.s3_client.generate_s3_path_for_image(
+                destination.place_id, place.place_id, file_name
+            )
+        if rendition.max_size == THUMBNAIL_MAX_SIZE:
+            return self.s3_client.generate_s3_path_for_thumbnail(
+                destination.place_id, place.place_id, file_name
+            )
+        return self.s3_client.generate_s3_path_for_rendition(
+            destination.place_id, place.place_id, rendition.max_size, file_name
         )
 
-        return s3_path, hsh, img.width, img.height
-
-    def _upload_thumbnail_to_s3(
-        self, img: Image.Image, destination: Destination, place: Place
+    def _upload_rendition_to_s3(
+        self, rendition: Rendition, destination: Destination, place: Place, uploaded: Set[str]
     ) -> str:
-        img = rescale_image(img, THUMBNAIL_MAX_SIZE)
-        buffer = save_image_to_buffer(img)
-        hsh = hash_buffer_md5(buffer)
-        file_name = f"{hsh}.{IMAGE_TYPE}"
-        thumbnail_path = self.s3_client.generate_s3_path_for_thumbnail(
-            destination.place_id, place.place_id, file_name
-        )
-        s3_path = self.s3_client.write_image_to_s3(
-            thumbnail_path,
-            buffer,
+        file_path = self._get_rendition_path(rendition, destination, place)
+        if file_path in uploaded:
+            return self.s3_client.get_url(file_path)
+
+        return self.executor.upload_limiter.call(
+            self.s3_client.write_image_to_s3,
+            file_path,
+            rendition.buffer,
+            content_type=self.ENCODER_PROFILE.content_type,
             ACL="public-read",
-            ContentType="image/png",
         )
-        return s3_path
 
-    def edit_destination(self, destination: Destination = None) -> None:
+    def _create_record(self, pk: str, sk: str, obj: Any, description: str) -> Optional[Any]:
+        """
+        A method for writing a new record, with the existence check done in the same request as
+        the write.  If one already exists the user can overwrite it with their edits, edit them
+        again first or cancel.  Returns the record written, or None if the user cancelled.
         """
-        A method for editing a Destination
+        try:
+            self.ddb_client.put(pk, sk, obj.asdict(), overwrite=False)
+            return obj
+        except ItemAlreadyExistsException:
+            pass
+
+        while True:
+            choice = get_input(
+                f"A record already exists for {description}. "
+                "Overwrite it with your changes, edit them again or cancel? (o/e/c)"
+            ).lower()
+            if choice in ("o", "overwrite"):
+                self.ddb_client.upsert(pk, sk, obj.asdict())
+                return obj
+            if choice in ("e", "edit"):
+                obj = edit_obj(obj)
+            elif choice in ("c", "cancel"):
+                return None
+
+    def edit_destination(self, destination: Destination = None, create: bool = False) -> None:
+        """
+        A method for editing a Destination, or creating it if `create` is set
         """
         print_figlet(APP_NAME)
         if destination is None:
@@ -629,12 +854,33 @@ class TravelCLI(BaseCLI):
             destination = destinations[sel - 1]
 
         new_dest: Destination = edit_obj(destination)
-        self.ddb_client.put(self.DESTINATION_PK, destination.place_id, new_dest.asdict())
+        if not create:
+            self.ddb_client.put(self.DESTINATION_PK, destination.place_id, new_dest.asdict())
+        else:
+            written = self._create_record(
+                self.DESTINATION_PK,
+                destination.place_id,
+                new_dest,
+                f"destination: {destination.place_id}",
+            )
+            if written is None:
+                return
+            new_dest = written
+
+        self._put_collection_copy(
+            destination.place_id, self.COLLECTION_DESTINATION_SK, new_dest.asdict()
+        )
+        if create:
+            # A new Destination's collection gets every record written under it from the start
+            self._put_collection_copy(destination.place_id, self.COLLECTION_COMPLETE_SK, {})
 
     # Menu Option 5
-    def edit_place(self, destination: Destination = None, place: Place = None) -> None:
+    def edit_place(
+        self, destination: Destination = None, place: Place = None, create: bool = False
+    ) -> bool:
         """
-        A method for editing a Place
+        A method for editing a Place, or creating it if `create` is set.  Returns whether the
+        Place was written.
         """
         print_figlet(APP_NAME)
         if not destination:
@@ -655,7 +901,7 @@ class TravelCLI(BaseCLI):
                 MenuNavigationCodes.GO_BACK,
             ]:
                 cls()
-                return
+                return False
 
             print_figlet(APP_NAME)
             destination = destinations[sel - 1]
@@ -675,21 +921,34 @@ class TravelCLI(BaseCLI):
 
             if sel == MenuNavigationCodes.GO_TO_MAIN_MENU:
                 cls()
-                return
+                return False
 
             if sel == MenuNavigationCodes.GO_BACK:
-                self.edit_place()
-                return
+                return self.edit_place()
 
             print_figlet(APP_NAME)
             place = places[sel - 1]
 
+        place_sk = self.PLACE_SK_FS.format(
+            destination_id=place.destination_id, place_id=place.place_id
+        )
         new_place: Place = edit_obj(place)
-        self.ddb_client.put(
-            self.PLACE_PK,
-            self.PLACE_SK_FS.format(destination_id=place.destination_id, place_id=place.place_id),
+        if not create:
+            self.ddb_client.put(self.PLACE_PK, place_sk, new_place.asdict())
+        else:
+            written = self._create_record(
+                self.PLACE_PK, place_sk, new_place, f"place: {place.place_id}"
+            )
+            if written is None:
+                return False
+            new_place = written
+
+        self._put_collection_copy(
+            place.destination_id,
+            self.COLLECTION_PLACE_SK_FS.format(place_id=place.place_id),
             new_place.asdict(),
         )
+        return True
 
     def delete_destination(self) -> None:
         """
@@ -717,6 +976,8 @@ class TravelCLI(BaseCLI):
         print_figlet(APP_NAME)
         destination = destinations[sel - 1]
         self.ddb_client.delete(pk=self.DESTINATION_PK, sk=destination.place_id)
+        self._delete_collection_copy(destination.place_id, self.COLLECTION_DESTINATION_SK)
+        self._delete_collection_copy(destination.place_id, self.COLLECTION_COMPLETE_SK)
 
     def delete_place(self) -> None:
         """
@@ -771,5 +1032,8 @@ class TravelCLI(BaseCLI):
                 destination_id=place.destination_id, place_id=place.place_id
             ),
         )
+        self._delete_collection_copy(
+            place.destination_id, self.COLLECTION_PLACE_SK_FS.format(place_id=place.place_id)
+        )
 
         return
@@ -5,6 +5,13 @@ from .ddb_client import (  # noqa F401
     ResumeEntities,
     HomeEntities,
 )
+from .async_ddb_client import AsyncDDBClient  # noqa F401
+from .ddb_batch_writer import DDBBatchWriter  # noqa F401
+from .local_mirror import LocalMirror  # noqa F401
+from .query_cache import QueryCache  # noqa F401
+from .downloader import Downloader  # noqa F401
 from .s3_client import S3Client  # noqa F401
+from .async_s3_client import AsyncS3Client  # noqa F401
+from .album_catalogue import AlbumCatalogue  # noqa F401
 from .google_photos_client import GooglePhotosClient  # noqa F401
 from .google_maps_client import GoogleMapsClient  # noqa F401
@@ -0,0 +1,98 @@
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+
+class AlbumCatalogue:
+    """
+    A JSON file holding the fields of each Google Photos album the menus need (id, title,
+    mediaItemsCount and the cover photo), so albums can be searched as soon as the CLI starts
+    rather than after the whole library has been listed again.
+
+    The catalogue is stale once `ttl` seconds have passed since it was last refreshed.  Refreshes
+    can stop early at albums that are already catalogued, so once `full_refresh_age` seconds have
+    passed since every album was last listed, the next refresh has to list them all again.
+    """
+
+    DEFAULT_TTL_SECONDS = 24 * 3600
+    DEFAULT_FULL_REFRESH_AGE_SECONDS = 7 * 24 * 3600
+    FIELDS = ["id", "title", "mediaItemsCount", "coverPhotoBaseUrl", "coverPhotoMediaItemId"]
+    # The cover photo's base url is a short-lived signed url that changes on every listing, so
+    # it isn't compared when checking whether an album has changed
+    STABLE_FIELDS = ["id", "title", "mediaItemsCount", "coverPhotoMediaItemId"]
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float = DEFAULT_TTL_SECONDS,
+        full_refresh_age: float = DEFAULT_FULL_REFRESH_AGE_SECONDS,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.full_refresh_age = full_refresh_age
+        self.refreshed_at = 0.0
+        self.fully_refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def to_entry(cls, album: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        A method for trimming an album from the Google Photos API down to the catalogued fields
+        """
+        return {field: album[field] for field in cls.FIELDS if field in album}
+
+    @classmethod
+    def is_unchanged(cls, album: Dict[str, Any], entry: Optional[Dict[str, Any]]) -> bool:
+        """
+        A method for checking whether an album is catalogued as entry, ignoring the fields that
+        change on every listing
+        """
+        return entry is not None and all(
+            album.get(field) == entry.get(field) for field in cls.STABLE_FIELDS
+        )
+
+    def is_stale(self) -> bool:
+        return time.time() - self.refreshed_at > self.ttl
+
+    def needs_full_refresh(self) -> bool:
+        return time.time() - self.fully_refreshed_at > self.full_refresh_age
+
+    def load(self) -> List[Dict[str, Any]]:
+        """
+        A method for reading the catalogued albums, a missing or unreadable file is an empty
+        catalogue
+        """
+        with self._lock:
+            try:
+                with open(self.path) as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                return []
+
+            self.refreshed_at = data.get("refreshed_at", 0.0)
+            self.fully_refreshed_at = data.get("fully_refreshed_at", 0.0)
+            return data.get("albums", [])
+
+    def save(self, albums: List[Dict[str, Any]], full: bool = False) -> None:
+        """
+        A method for replacing the catalogue, written to a temporary file first so a crash
+        can't leave half a catalogue behind.  full is whether every album was listed.
+        """
+        with self._lock:
+            refreshed_at = time.time()
+            fully_refreshed_at = refreshed_at if full else self.fully_refreshed_at
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(
+                    {
+                        "refreshed_at": refreshed_at,
+                        "fully_refreshed_at": fully_refreshed_at,
+                        "albums": [self.to_entry(a) for a in albums],
+                    },
+                    f,
+                )
+            os.replace(tmp_path, self.path)
+            self.refreshed_at = refreshed_at
+            self.fully_refreshed_at = fully_refreshed_at
@@ -0,0 +1,64 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .ddb_client import DDBClient
+
+
+class AsyncDDBClient:
+    """
+    An asyncio facade over DDBClient.  Calls run on a thread pool no larger than the client's
+    connection pool, so awaiting them doesn't block the event loop and concurrent calls never
+    wait on a connection.  The wrapped client's cache and mirror are shared with synchronous
+    callers.
+    """
+
+    def __init__(self, ddb_client: DDBClient, max_workers: Optional[int] = None):
+        self.ddb_client = ddb_client
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or ddb_client.max_pool_connections,
+            thread_name_prefix="ddb",
+        )
+
+    async def _run(self, fn: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def get_equals(
+        self,
+        partition_key: str,
+        sort_key: Optional[str] = None,
+        attributes: Optional[List[str]] = None,
+    ) -> List:
+        return await self._run(self.ddb_client.get_equals, partition_key, sort_key, attributes)
+
+    async def get_begins_with(
+        self, partition_key: str, sort_key: str, attributes: Optional[List[str]] = None
+    ) -> List:
+        return await self._run(self.ddb_client.get_begins_with, partition_key, sort_key, attributes)
+
+    async def get_subtree(self, partition_key: str) -> Dict[str, List[Dict[str, Any]]]:
+        return await self._run(self.ddb_client.get_subtree, partition_key)
+
+    async def put(self, pk: str, sk: str, entity: Dict[str, Any], overwrite: bool = True) -> None:
+        await self._run(self.ddb_client.put, pk, sk, entity, overwrite=overwrite)
+
+    async def upsert(self, pk: str, sk: str, entity: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        return await self._run(self.ddb_client.upsert, pk, sk, entity)
+
+    async def delete(self, pk: str, sk: str) -> None:
+        await self._run(self.ddb_client.delete, pk, sk)
+
+    async def batch_put(self, items: Iterable[Tuple[str, str, Dict[str, Any]]]) -> None:
+        # Materialized here so a generator isn't consumed on the executor thread
+        await self._run(self.ddb_client.batch_put, list(items))
+
+    async def batch_delete(self, keys: Iterable[Tuple[str, str]]) -> None:
+        await self._run(self.ddb_client.batch_delete, list(keys))
+
+    def close(self) -> None:
+        """
+        A method for waiting on any calls still running and shutting down the thread pool
+        """
+        self._executor.shutdown(wait=True)
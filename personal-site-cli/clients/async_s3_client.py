@@ -0,0 +1,42 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Any, Callable, Optional
+
+from .s3_client import S3Client
+
+
+class AsyncS3Client:
+    """
+    An asyncio facade over S3Client.  Uploads and existence checks run on a thread pool no larger
+    than the client's connection pool, so many of them can be in flight while the event loop
+    keeps working.
+    """
+
+    def __init__(self, s3_client: S3Client, max_workers: Optional[int] = None):
+        self.s3_client = s3_client
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or s3_client.max_pool_connections,
+            thread_name_prefix="s3",
+        )
+
+    async def _run(self, fn: Callable, *args, **kwargs) -> Any:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def write_image_to_s3(
+        self, file_name: str, img: BytesIO, content_type: str = "image/png", **kwargs
+    ) -> str:
+        return await self._run(
+            self.s3_client.write_image_to_s3, file_name, img, content_type, **kwargs
+        )
+
+    async def does_image_exist(self, file_name: str) -> bool:
+        return await self._run(self.s3_client.does_image_exist, file_name)
+
+    def close(self) -> None:
+        """
+        A method for waiting on any uploads still running and shutting down the thread pool
+        """
+        self._executor.shutdown(wait=True)
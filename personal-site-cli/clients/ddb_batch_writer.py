@@ -0,0 +1,121 @@
+import threading
+from typing import TYPE_CHECKING, Any, Dict, Optional, Set, Tuple
+
+from utils.throttling import ConcurrencyLimiter
+
+if TYPE_CHECKING:
+    from .ddb_client import DDBClient
+
+
+class DDBBatchWriter:
+    """
+    A thread-safe buffer of DynamoDB writes.  The buffer is flushed through BatchWriteItem once it
+    holds `max_size` requests, and by a background thread every `flush_interval` seconds so that
+    a slow trickle of writes doesn't sit in memory.  An optional limiter caps how many flushes
+    run at once and backs them off when DynamoDB throttles.
+
+    Requests from a flush that fails go back into the buffer, unless a newer request for the
+    same key has been buffered since, so they're retried by the next flush.  If any are still
+    unwritten once the writer is closed, their keys are kept in `unwritten` and the last error
+    is raised.
+    """
+
+    DEFAULT_FLUSH_INTERVAL_SECONDS = 1.0
+
+    def __init__(
+        self,
+        ddb_client: "DDBClient",
+        max_size: int,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL_SECONDS,
+        limiter: Optional[ConcurrencyLimiter] = None,
+    ):
+        self._ddb_client = ddb_client
+        self.max_size = max_size
+        self.flush_interval = flush_interval
+        self.limiter = limiter
+
+        self._lock = threading.Lock()
+        self._buffer: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self._error: Optional[Exception] = None
+        self.unwritten: Set[Tuple[str, str]] = set()
+
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self._flusher.start()
+
+    def __enter__(self) -> "DDBBatchWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _flush_periodically(self) -> None:
+        while not self._closed.wait(self.flush_interval):
+            self._try_flush()
+
+    def _try_flush(self, requests: Optional[Dict[Tuple[str, str], Dict[str, Any]]] = None) -> None:
+        try:
+            if requests is None:
+                self.flush()
+            else:
+                self._write(requests)
+        except Exception as e:
+            # The requests are back in the buffer, the failure is surfaced by close() if they're
+            # still unwritten then
+            self._error = e
+
+    def _drain(self) -> Dict[Tuple[str, str], Dict[str, Any]]:
+        requests = self._buffer
+        self._buffer = {}
+        return requests
+
+    def _add(self, key: Tuple[str, str], request: Dict[str, Any]) -> None:
+        with self._lock:
+            # A later write to the same key replaces the buffered one, as it would in DynamoDB
+            self._buffer[key] = request
+            if len(self._buffer) < self.max_size:
+                return
+            requests = self._drain()
+
+        self._try_flush(requests)
+
+    def _write(self, requests: Dict[Tuple[str, str], Dict[str, Any]]) -> None:
+        try:
+            if self.limiter:
+                self.limiter.call(self._ddb_client._batch_write, list(requests.values()))
+            else:
+                self._ddb_client._batch_write(list(requests.values()))
+        except Exception:
+            with self._lock:
+                for key, request in requests.items():
+                    # A request buffered while this one was being written supersedes it
+                    self._buffer.setdefault(key, request)
+            raise
+
+    def put(self, pk: str, sk: str, entity: Dict[str, Any]) -> None:
+        item = self._ddb_client._make_item(pk, sk, entity)
+        self._add((pk, sk), {"PutRequest": {"Item": item}})
+
+    def delete(self, pk: str, sk: str) -> None:
+        key = {self._ddb_client.PARTITION_KEY: pk, self._ddb_client.SORT_KEY: sk}
+        self._add((pk, sk), {"DeleteRequest": {"Key": key}})
+
+    def flush(self) -> None:
+        with self._lock:
+            requests = self._drain()
+
+        if requests:
+            self._write(requests)
+
+    def close(self) -> None:
+        """
+        A method for stopping the background flusher and writing whatever is left in the buffer
+        """
+        self._closed.set()
+        self._flusher.join()
+        self._try_flush()
+
+        with self._lock:
+            self.unwritten = set(self._buffer)
+        if self.unwritten and self._error:
+            raise self._error
@@ -1,10 +1,24 @@
-from typing import Any, Dict, List
+import random
+import time
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from boto3 import Session
-from boto3.dynamodb.conditions import ConditionBase, Key
-from exceptions import DynamoDBException
-from mypy_boto3_dynamodb.service_resource import Table
+from boto3.dynamodb.conditions import Attr, ConditionBase, Key
+from botocore.config import Config
+from exceptions import (
+    DynamoDBException,
+    DynamoDBThrottlingException,
+    ItemAlreadyExistsException,
+)
+from mypy_boto3_dynamodb.client import DynamoDBClient
+from mypy_boto3_dynamodb.service_resource import DynamoDBServiceResource, Table
 from mypy_boto3_dynamodb.type_defs import PutItemOutputTableTypeDef, QueryOutputTableTypeDef
+from utils.throttling import ConcurrencyLimiter
+
+from .ddb_batch_writer import DDBBatchWriter
+from .local_mirror import LocalMirror
+from .query_cache import QueryCache
 
 
 class Namespaces:
@@ -34,50 +48,466 @@ class DDBClient:
     PARTITION_KEY = "PK"
     SORT_KEY = "SK"
     ENTITY = "Entity"
+    # Epoch milliseconds of the last write to an item, used to sync the local mirror incrementally
+    UPDATED_AT = "UpdatedAt"
+
+    # BatchWriteItem accepts at most 25 put/delete requests per call
+    BATCH_WRITE_SIZE = 25
+    BATCH_WRITE_MAX_RETRIES = 8
+    BATCH_WRITE_BASE_BACKOFF_SECONDS = 0.05
+
+    MIRROR_SYNC_BATCH_SIZE = 500
+
+    # Sized for the photo worker threads plus the async facade's executor sharing the client
+    MAX_POOL_CONNECTIONS = 16
+
+    def __init__(
+        self,
+        session: Session,
+        table_name: str,
+        cache: Optional[QueryCache] = None,
+        mirror: Optional[LocalMirror] = None,
+        offline: bool = False,
+        max_pool_connections: int = MAX_POOL_CONNECTIONS,
+    ):
+        if offline and not mirror:
+            raise DynamoDBException("Offline mode requires a local mirror")
 
-    def __init__(self, session: Session, table_name: str):
         self._session = session
         self.table_name = table_name
-        self.table: Table = session.resource("dynamodb").Table(table_name)
+        self.cache = cache
+        self.mirror = mirror
+        self.offline = offline
+        self.max_pool_connections = max_pool_connections
+
+        config = Config(max_pool_connections=max_pool_connections)
+        self._resource: DynamoDBServiceResource = session.resource("dynamodb", config=config)
+        self.table: Table = self._resource.Table(table_name)
+        # The resource's own client converts items to Python types, a plain client leaves them as
+        # DynamoDB's typed JSON
+        self._client: DynamoDBClient = session.client("dynamodb", config=config)
+
+    def _iter_query(
+        self,
+        filtering_exp: ConditionBase,
+        page_size: Optional[int] = None,
+        limit: Optional[int] = None,
+        attributes: Optional[List[str]] = None,
+    ) -> Iterator[Any]:
+        """
+        A generator that lazily pages through a query, following LastEvaluatedKey until the
+        partition is exhausted or `limit` entities have been yielded
+        """
+        kwargs: Dict[str, Any] = {"KeyConditionExpression": filtering_exp}
+        if attributes:
+            kwargs.update(self._projection(attributes))
+
+        for item in self._iter_items(kwargs, page_size, limit):
+            # A projection that matches nothing in an entity leaves the Entity map out entirely
+            yield item.get(self.ENTITY, {})
+
+    def _iter_items(
+        self,
+        kwargs: Dict[str, Any],
+        page_size: Optional[int] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[Any]:
+        """
+        A generator that yields the raw items of a query, one page at a time
+        """
+        kwargs = dict(kwargs)
+
+        yielded = 0
+        while True:
+            if page_size or limit:
+                remaining = limit - yielded if limit else None
+                kwargs["Limit"] = min(filter(None, (page_size, remaining)))
+
+            resp: QueryOutputTableTypeDef = self.table.query(**kwargs)
+            for item in resp["Items"]:
+                yield item
+                yielded += 1
+
+            if "LastEvaluatedKey" not in resp or (limit and yielded >= limit):
+                return
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
+
+    def iter_scan_segment(
+        self, segment: int, total_segments: int, page_size: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        A generator that scans one segment of the table, yielding items in DynamoDB's typed JSON
+        format (e.g. {"PK": {"S": "..."}}) so they can be stored and restored without loss
+        """
+        kwargs: Dict[str, Any] = {
+            "TableName": self.table_name,
+            "Segment": segment,
+            "TotalSegments": total_segments,
+        }
+        if page_size:
+            kwargs["Limit"] = page_size
+
+        while True:
+            resp = self._client.scan(**kwargs)
+            yield from resp["Items"]
+
+            if "LastEvaluatedKey" not in resp:
+                return
+            kwargs["ExclusiveStartKey"] = resp["LastEvaluatedKey"]
 
-    def _query_table(self, filtering_exp: ConditionBase) -> List:
-        resp: QueryOutputTableTypeDef = self.table.query(KeyConditionExpression=filtering_exp)
-        return [item["Entity"] for item in resp["Items"]]
+    def _projection(self, attributes: List[str]) -> Dict[str, Any]:
+        """
+        A method for building a ProjectionExpression from dotted attribute paths, e.g.
+        ["Entity.hsh"].  Every path segment gets a placeholder name so reserved words are safe.
+        """
+        names: Dict[str, str] = {}
+        paths = []
+        for attribute in attributes:
+            segments = []
+            for segment in attribute.split("."):
+                placeholder = f"#p{len(names)}"
+                names[placeholder] = segment
+                segments.append(placeholder)
+            paths.append(".".join(segments))
 
-    def _put_item(self, data: Dict[str, Any]) -> None:
-        resp: PutItemOutputTableTypeDef = self.table.put_item(Item=data)
+        return {"ProjectionExpression": ", ".join(paths), "ExpressionAttributeNames": names}
+
+    def _make_item(self, pk: str, sk: str, entity: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            self.PARTITION_KEY: pk,
+            self.SORT_KEY: sk,
+            self.ENTITY: entity,
+            self.UPDATED_AT: int(time.time() * 1000),
+        }
+
+    def _check_online(self) -> None:
+        if self.offline:
+            raise DynamoDBException("Writes are not allowed in offline mode")
+
+    def _invalidate(self, pk: str, sk: Optional[str] = None) -> None:
+        if self.cache:
+            self.cache.invalidate(pk, sk)
+
+    def _record_put(self, item: Dict[str, Any]) -> None:
+        """
+        A method for reflecting a successful put in the local mirror
+        """
+        if self.mirror:
+            self.mirror.upsert(
+                [
+                    (
+                        item[self.PARTITION_KEY],
+                        item[self.SORT_KEY],
+                        item[self.ENTITY],
+                        item[self.UPDATED_AT],
+                    )
+                ]
+            )
+
+    def _put_item(self, data: Dict[str, Any], **kwargs) -> PutItemOutputTableTypeDef:
+        self._check_online()
+        try:
+            resp: PutItemOutputTableTypeDef = self.table.put_item(Item=data, **kwargs)
+        except self.table.meta.client.exceptions.ConditionalCheckFailedException:
+            raise ItemAlreadyExistsException(
+                f"Item already exists: {data[self.PARTITION_KEY]}, {data[self.SORT_KEY]}"
+            )
+        self._invalidate(data[self.PARTITION_KEY], data.get(self.SORT_KEY))
 
         if resp["ResponseMetadata"]["HTTPStatusCode"] != 200:
             raise DynamoDBException(f"Put operation failed: {resp}")
-        return
+
+        self._record_put(data)
+        return resp
 
     def _delete_item(self, pk: str, sk: str = None) -> None:
+        self._check_online()
         key = {self.PARTITION_KEY: pk}
         if sk:
             key[self.SORT_KEY] = sk
 
         resp = self.table.delete_item(Key=key)
+        self._invalidate(pk, sk)
 
         if resp["ResponseMetadata"]["HTTPStatusCode"] != 200:
             raise DynamoDBException(f"Delete operation failed: {resp}")
 
+        if self.mirror:
+            self.mirror.delete(pk, sk)
         return
 
-    def get_equals(self, partition_key: str, sort_key: str = None) -> List:
+    def _request_key(self, request: Dict[str, Any]) -> Tuple[str, str]:
+        if "PutRequest" in request:
+            item = request["PutRequest"]["Item"]
+        else:
+            item = request["DeleteRequest"]["Key"]
+        return item[self.PARTITION_KEY], item.get(self.SORT_KEY, "")
+
+    def _batch_write(self, requests: Iterable[Dict[str, Any]]) -> None:
+        """
+        A method for writing put/delete requests through BatchWriteItem, 25 at a time.  Requests
+        for the same key are collapsed (last one wins) because DynamoDB rejects batches that
+        touch a key twice.
+        """
+        self._check_online()
+        by_key = {self._request_key(request): request for request in requests}
+        deduped = list(by_key.values())
+
+        try:
+            for i in range(0, len(deduped), self.BATCH_WRITE_SIZE):
+                chunk = deduped[i : i + self.BATCH_WRITE_SIZE]
+                self._batch_write_chunk(chunk)
+
+                for request in chunk:
+                    if "PutRequest" in request:
+                        self._record_put(request["PutRequest"]["Item"])
+                    elif self.mirror:
+                        self.mirror.delete(*self._request_key(request))
+        finally:
+            for pk, sk in by_key:
+                self._invalidate(pk, sk)
+
+    def _batch_write_chunk(self, chunk: List[Dict[str, Any]]) -> None:
+        """
+        A method for writing a single BatchWriteItem call, retrying any UnprocessedItems with
+        jittered exponential backoff
+        """
+        request_items: Dict[str, Any] = {self.table_name: chunk}
+
+        for attempt in range(self.BATCH_WRITE_MAX_RETRIES + 1):
+            resp = self._resource.batch_write_item(RequestItems=request_items)
+
+            if resp["ResponseMetadata"]["HTTPStatusCode"] != 200:
+                raise DynamoDBException(f"Batch write operation failed: {resp}")
+
+            request_items = resp.get("UnprocessedItems", {})
+            if not request_items:
+                return
+
+            time.sleep(random.uniform(0, self.BATCH_WRITE_BASE_BACKOFF_SECONDS * 2**attempt))
+
+        # Items are only left unprocessed when the table is out of capacity, so this is throttling
+        raise DynamoDBThrottlingException(f"Batch write left unprocessed items: {request_items}")
+
+    def _equals_exp(self, partition_key: str, sort_key: Optional[str] = None) -> ConditionBase:
         filtering_exp: ConditionBase = Key(self.PARTITION_KEY).eq(partition_key)
         if sort_key:
             filtering_exp = filtering_exp & Key(self.SORT_KEY).eq(sort_key)
-        return self._query_table(filtering_exp)
+        return filtering_exp
+
+    def _begins_with_exp(self, partition_key: str, sort_key: str) -> ConditionBase:
+        return Key(self.PARTITION_KEY).eq(partition_key) & Key(self.SORT_KEY).begins_with(sort_key)
+
+    def _mirror_for(self, pk: str) -> Optional[LocalMirror]:
+        """
+        A method for deciding whether a read can be answered by the local mirror, syncing the
+        partition first if it is missing or stale (unless offline)
+        """
+        if not self.mirror:
+            return None
+
+        if not self.offline and self.mirror.needs_sync(pk):
+            self.sync_partition(pk)
+        return self.mirror
+
+    def sync_partition(self, pk: str, full: bool = False) -> None:
+        """
+        A method for copying a partition into the local mirror.  Only items written since the last
+        sync are transferred, unless `full` is set, in which case the partition is rebuilt.
+
+        The filter on UpdatedAt is applied after DynamoDB reads the partition, so an incremental
+        sync saves the bytes sent back but not read capacity or round trips.  It also can't see
+        deletes, and the watermark comes from the writers' clocks, so a write stamped earlier than
+        it by a skewed or late writer is missed too.  Both are only picked up by a full sync, see
+        `resync_mirror`.
+        """
+        assert self.mirror, "No local mirror is configured"
+
+        if full:
+            self.mirror.clear_partition(pk)
+
+        watermark = self.mirror.watermark(pk)
+        kwargs: Dict[str, Any] = {"KeyConditionExpression": Key(self.PARTITION_KEY).eq(pk)}
+        if watermark:
+            # >= rather than >, so items written within the same millisecond aren't missed
+            kwargs["FilterExpression"] = Attr(self.UPDATED_AT).gte(watermark)
+
+        batch: List[Tuple[str, str, Dict[str, Any], int]] = []
+        for item in self._iter_items(kwargs):
+            # Items written before timestamps were introduced count as infinitely old
+            updated_at = int(item.get(self.UPDATED_AT, 0))
+            watermark = max(watermark, updated_at)
+            batch.append((pk, item[self.SORT_KEY], item.get(self.ENTITY, {}), updated_at))
+
+            if len(batch) >= self.MIRROR_SYNC_BATCH_SIZE:
+                self.mirror.upsert(batch)
+                batch = []
+
+        self.mirror.upsert(batch)
+        self.mirror.mark_synced(pk, watermark)
+
+    def resync_mirror(self) -> List[str]:
+        """
+        A method for rebuilding every partition in the local mirror from DynamoDB, which picks
+        up the items other writers deleted or that incremental syncs missed.  Returns the
+        partitions rebuilt.
+        """
+        assert self.mirror, "No local mirror is configured"
+        if self.offline:
+            raise DynamoDBException("The local mirror can't be synced in offline mode")
+
+        partitions = self.mirror.partitions()
+        for pk in partitions:
+            self.sync_partition(pk, full=True)
+            self._invalidate(pk)
+        return partitions
 
-    def get_begins_with(self, partition_key: str, sort_key: str) -> List:
-        filtering_exp: ConditionBase = Key(self.PARTITION_KEY).eq(partition_key) & Key(
-            self.SORT_KEY
-        ).begins_with(sort_key)
-        return self._query_table(filtering_exp)
+    def iter_equals(
+        self,
+        partition_key: str,
+        sort_key: Optional[str] = None,
+        page_size: Optional[int] = None,
+        limit: Optional[int] = None,
+        attributes: Optional[List[str]] = None,
+    ) -> Iterator[Any]:
+        """
+        A method for lazily iterating over the entities matching a partition key (and sort key).
+        Entities served from the local mirror are never projected.
+        """
+        mirror = self._mirror_for(partition_key)
+        if mirror:
+            return islice(mirror.iter_equals(partition_key, sort_key or None), limit)
 
-    def put(self, pk: str, sk: str, entity: Dict[str, Any]) -> None:
-        data = {self.PARTITION_KEY: pk, self.SORT_KEY: sk, self.ENTITY: entity}
-        self._put_item(data)
+        return self._iter_query(
+            self._equals_exp(partition_key, sort_key), page_size, limit, attributes
+        )
+
+    def iter_begins_with(
+        self,
+        partition_key: str,
+        sort_key: str,
+        page_size: Optional[int] = None,
+        limit: Optional[int] = None,
+        attributes: Optional[List[str]] = None,
+    ) -> Iterator[Any]:
+        """
+        A method for lazily iterating over the entities in a partition whose sort key starts
+        with a prefix.  Entities served from the local mirror are never projected.
+        """
+        mirror = self._mirror_for(partition_key)
+        if mirror:
+            return islice(mirror.iter_begins_with(partition_key, sort_key), limit)
+
+        return self._iter_query(
+            self._begins_with_exp(partition_key, sort_key), page_size, limit, attributes
+        )
+
+    def get_subtree(
+        self, partition_key: str, page_size: Optional[int] = None
+    ) -> Dict[str, List[Any]]:
+        """
+        A method for loading a whole item collection in one paginated query.  Entities are grouped
+        by their entity type, which is the part of the sort key before the first '#', e.g.
+        PLACE#<place_id> -> PLACE
+        """
+        items: Iterable[Tuple[str, Dict[str, Any]]]
+        mirror = self._mirror_for(partition_key)
+        if mirror:
+            items = mirror.iter_items(partition_key)
+        else:
+            kwargs = {"KeyConditionExpression": Key(self.PARTITION_KEY).eq(partition_key)}
+            items = (
+                (item[self.SORT_KEY], item.get(self.ENTITY, {}))
+                for item in self._iter_items(kwargs, page_size)
+            )
+
+        subtree: Dict[str, List[Any]] = {}
+        for sk, entity in items:
+            subtree.setdefault(sk.split("#", 1)[0], []).append(entity)
+        return subtree
+
+    def get_equals(
+        self,
+        partition_key: str,
+        sort_key: Optional[str] = None,
+        attributes: Optional[List[str]] = None,
+    ) -> List:
+        def load() -> List:
+            return list(self.iter_equals(partition_key, sort_key, attributes=attributes))
+
+        if not self.cache:
+            return load()
+        key = QueryCache.make_key(partition_key, sort_key or None, False, attributes)
+        return self.cache.get_or_load(key, load)
+
+    def get_begins_with(
+        self, partition_key: str, sort_key: str, attributes: Optional[List[str]] = None
+    ) -> List:
+        def load() -> List:
+            return list(self.iter_begins_with(partition_key, sort_key, attributes=attributes))
+
+        if not self.cache:
+            return load()
+        key = QueryCache.make_key(partition_key, sort_key, True, attributes)
+        return self.cache.get_or_load(key, load)
+
+    def put(self, pk: str, sk: str, entity: Dict[str, Any], overwrite: bool = True) -> None:
+        """
+        A method for writing a record.  With overwrite=False the existence check happens in the
+        same request as the write, and ItemAlreadyExistsException is raised if the record exists.
+        """
+        kwargs = {}
+        if not overwrite:
+            kwargs["ConditionExpression"] = Attr(self.PARTITION_KEY).not_exists()
+        self._put_item(self._make_item(pk, sk, entity), **kwargs)
+
+    def upsert(self, pk: str, sk: str, entity: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        A method for writing a record and returning the entity it replaced, if there was one
+        """
+        resp = self._put_item(self._make_item(pk, sk, entity), ReturnValues="ALL_OLD")
+        old: Dict[str, Any] = dict(resp.get("Attributes", {}))
+        return old.get(self.ENTITY)
 
     def delete(self, pk: str, sk: str) -> None:
         self._delete_item(pk, sk)
+
+    def batch_put(self, items: Iterable[Tuple[str, str, Dict[str, Any]]]) -> None:
+        """
+        A method for writing many (pk, sk, entity) records using BatchWriteItem
+        """
+        self._batch_write(
+            {"PutRequest": {"Item": self._make_item(pk, sk, entity)}} for pk, sk, entity in items
+        )
+
+    def batch_put_items(self, items: Iterable[Dict[str, Any]]) -> None:
+        """
+        A method for writing complete items (PK, SK, Entity, ...) using BatchWriteItem, e.g. when
+        restoring a backup.  The write timestamp is refreshed like any other write.
+        """
+        updated_at = int(time.time() * 1000)
+        self._batch_write(
+            {"PutRequest": {"Item": {**item, self.UPDATED_AT: updated_at}}} for item in items
+        )
+
+    def batch_delete(self, keys: Iterable[Tuple[str, str]]) -> None:
+        """
+        A method for deleting many (pk, sk) records using BatchWriteItem
+        """
+        self._batch_write(
+            {"DeleteRequest": {"Key": {self.PARTITION_KEY: pk, self.SORT_KEY: sk}}}
+            for pk, sk in keys
+        )
+
+    def batch_writer(
+        self,
+        max_size: int = BATCH_WRITE_SIZE,
+        flush_interval: float = DDBBatchWriter.DEFAULT_FLUSH_INTERVAL_SECONDS,
+        limiter: Optional[ConcurrencyLimiter] = None,
+    ) -> DDBBatchWriter:
+        """
+        A method for creating a buffered writer that can be shared between worker threads
+        """
+        return DDBBatchWriter(
+            self, max_size=max_size, flush_interval=flush_interval, limiter=limiter
+        )
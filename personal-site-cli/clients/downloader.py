@@ -0,0 +1,121 @@
+import random
+import time
+from tempfile import SpooledTemporaryFile
+from typing import IO, Dict, Optional, Tuple
+
+import requests
+from PIL import Image
+from requests.adapters import HTTPAdapter
+
+
+class IncompleteDownloadException(requests.exceptions.RequestException):
+    """Raised when a response ends before Content-Length bytes were received"""
+
+
+class Downloader:
+    """
+    A thread-safe HTTP downloader for photos.  Connections are pooled and kept alive across
+    downloads, bodies are streamed into a temporary file that stays in memory until it passes
+    `spool_threshold` bytes, and a dropped or truncated download is resumed with a Range request
+    rather than started over.
+    """
+
+    DEFAULT_POOL_SIZE = 32
+    # (connect, read) timeouts in seconds, the read timeout is per chunk rather than per download
+    DEFAULT_TIMEOUT = (5.0, 30.0)
+    DEFAULT_MAX_RETRIES = 3
+    DEFAULT_SPOOL_THRESHOLD_BYTES = 16 * 1024 * 1024
+    CHUNK_SIZE = 256 * 1024
+    BASE_BACKOFF_SECONDS = 0.5
+
+    RETRYABLE_EXCEPTIONS = (
+        requests.exceptions.ConnectionError,
+        requests.exceptions.ChunkedEncodingError,
+        requests.exceptions.Timeout,
+        IncompleteDownloadException,
+    )
+
+    def __init__(
+        self,
+        pool_size: int = DEFAULT_POOL_SIZE,
+        timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        spool_threshold: int = DEFAULT_SPOOL_THRESHOLD_BYTES,
+    ):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.spool_threshold = spool_threshold
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def __enter__(self) -> "Downloader":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def _fetch(self, url: str, file: IO[bytes]) -> None:
+        """
+        A method for writing the body of url into file, continuing from however much of it the
+        file already holds
+        """
+        offset = file.tell()
+        headers: Dict[str, str] = {"Range": f"bytes={offset}-"} if offset else {}
+        with self._session.get(url, headers=headers, stream=True, timeout=self.timeout) as resp:
+            resp.raise_for_status()
+            if offset and resp.status_code != 206:
+                # The server ignored the Range header and is sending the whole body again
+                file.seek(0)
+                file.truncate()
+                offset = 0
+
+            expected: Optional[int] = None
+            if "Content-Length" in resp.headers and "Content-Encoding" not in resp.headers:
+                expected = offset + int(resp.headers["Content-Length"])
+
+            for chunk in resp.iter_content(chunk_size=self.CHUNK_SIZE):
+                file.write(chunk)
+
+            if expected is not None and file.tell() < expected:
+                raise IncompleteDownloadException(f"Received {file.tell()} of {expected} bytes")
+
+    def download(self, url: str) -> IO[bytes]:
+        """
+        A method for downloading url into a temporary file, positioned at the start.  The caller
+        is responsible for closing it.
+        """
+        file: IO[bytes] = SpooledTemporaryFile(max_size=self.spool_threshold)  # type: ignore
+        attempt = 0
+        try:
+            while True:
+                try:
+                    self._fetch(url, file)
+                    break
+                except self.RETRYABLE_EXCEPTIONS:
+                    if attempt >= self.max_retries:
+                        raise
+                    time.sleep(random.uniform(0, self.BASE_BACKOFF_SECONDS * 2**attempt))
+                    attempt += 1
+        except BaseException:
+            file.close()
+            raise
+
+        file.seek(0)
+        return file
+
+    def download_bytes(self, url: str) -> bytes:
+        with self.download(url) as file:
+            return file.read()
+
+    def download_image(self, url: str) -> Image.Image:
+        with self.download(url) as file:
+            image = Image.open(file)
+            # Read the pixels now, while the temporary file is still open
+            image.load()
+        return image
+
+    def close(self) -> None:
+        self._session.close()
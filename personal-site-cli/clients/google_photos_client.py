@@ -1,22 +1,66 @@
-import asyncio
 import os
 import pickle
-from typing import Any, Dict, List
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
-from fuzzywuzzy import fuzz
 from google.auth.transport.requests import Request
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.http import build_http
+
+from utils.album_registry import AlbumRegistry
+from utils.album_search import AlbumSearchIndex
+
+from .album_catalogue import AlbumCatalogue
 
 API_SERVICE_NAME = "photoslibrary"
 API_VERSION = "v1"
 
 
 class GooglePhotosClient(object):
-    def __init__(self, config, scopes):
+    ALBUM_PAGE_SIZE = 50
+    # The largest page mediaItems.search allows
+    MEDIA_PAGE_SIZE = 100
+    MEDIA_ITEM_FIELDS = "nextPageToken,mediaItems(id,baseUrl,filename,mediaMetadata)"
+
+    def __init__(
+        self,
+        config,
+        scopes,
+        download_originals: bool = False,
+        catalogue: Optional[AlbumCatalogue] = None,
+    ):
+        self.download_originals = download_originals
+        self.catalogue = catalogue
+        self._credentials: Any = None
         self.service = self._create_service(config, scopes)
-        self.albums = asyncio.get_event_loop().create_task(self.get_albums())
-        self.done = None
+
+        self.registry = AlbumRegistry()
+        self.search_index = AlbumSearchIndex()
+        self._first_page = threading.Event()
+        self._stop_listing = threading.Event()
+        self.done = False
+
+        # Albums are listed on a thread of their own, so listing carries on while the menus are
+        # waiting on input, and the albums loaded so far can be searched before it finishes
+        self._listing_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="albums")
+        self.albums: Future = Future()
+
+        if catalogue is not None:
+            self.registry.add(catalogue.load())
+            self.search_index.add(self.registry.values())
+            if len(self.registry):
+                self._first_page.set()
+
+        if catalogue is None or catalogue.is_stale() or not len(self.registry):
+            # Every so often all the albums are listed again, so albums deleted or changed past
+            # where the refreshes stop early are caught
+            self.refresh_albums(full=catalogue is not None and catalogue.needs_full_refresh())
+        else:
+            self.done = True
+            self.albums.set_result(self.registry.values())
 
     def _create_service(self, config, scopes) -> Any:
         """
@@ -40,73 +84,162 @@ class GooglePhotosClient(object):
             with open(pickle_file, "wb") as token:
                 pickle.dump(cred, token)
 
+        self._credentials = cred
         service = build(API_SERVICE_NAME, API_VERSION, credentials=cred, static_discovery=False)
         return service
 
-    async def get_albums(self) -> List:
+    def _list_albums(self, full: bool) -> List[Dict]:
         """
-        A method for retrieving all the Google Photos albums for a user
+        A method for paging through the Google Photos albums for a user, runs on the listing
+        thread.  httplib2 connections can't be shared between threads, so the listing thread
+        makes its requests over its own.
+
+        Albums rarely change, so unless full is True listing stops at the first page that is
+        already catalogued as it is, and the rest of the catalogue is kept.  albums.list doesn't
+        document the order it lists albums in, so albums added, renamed or changed past that
+        page are missed until a full listing, which also drops albums that no longer exist.
         """
-        a = []
+        http = AuthorizedHttp(self._credentials, http=build_http())
+        known = self.registry.snapshot()
 
-        pageToken = ""
-        loop = True
-        while loop:
-            albums = self.service.albums().list(pageSize=50, pageToken=pageToken).execute()
-            for album in albums.get("albums", []):
-                a.append(album)
+        listed: Dict[str, Dict] = {}
+        page_token = ""
+        caught_up = False
+        complete = False
+        try:
+            while not self._stop_listing.is_set():
+                resp = (
+                    self.service.albums()
+                    .list(pageSize=self.ALBUM_PAGE_SIZE, pageToken=page_token)
+                    .execute(http=http)
+                )
+                page = [AlbumCatalogue.to_entry(album) for album in resp.get("albums", [])]
+                self.registry.add(page)
+                self.search_index.add(page)
+                self._first_page.set()
+                listed.update((album["id"], album) for album in page)
+
+                page_token = resp.get("nextPageToken", "")
+                if page_token == "":
+                    caught_up = complete = True
+                    break
+
+                if (
+                    not full
+                    and page
+                    and all(AlbumCatalogue.is_unchanged(a, known.get(a["id"])) for a in page)
+                ):
+                    listed.update((k, v) for k, v in known.items() if k not in listed)
+                    caught_up = True
+                    break
+
+            if caught_up:
+                if self.registry.replace(listed.values()):
+                    self.search_index = AlbumSearchIndex(listed.values())
+                if self.catalogue is not None:
+                    self.catalogue.save(list(listed.values()), full=complete)
+        finally:
+            self.done = True
+            self._first_page.set()
+
+        return self.registry.values()
+
+    def refresh_albums(self, full: bool = False) -> Future:
+        """
+        A method for listing the albums again in the background, the albums already loaded stay
+        searchable meanwhile
+        """
+        self.done = False
+        self.albums = self._listing_executor.submit(self._list_albums, full)
+        return self.albums
 
-            pageToken = albums.get("nextPageToken", "")
-            if pageToken == "":
-                loop = False
+    def listing_error(self) -> Optional[BaseException]:
+        """
+        A method for returning the error the last album listing failed with, if it failed
+        """
+        if not self.albums.done():
+            return None
+        return self.albums.exception()
 
-        self.done = True
-        return a
+    def get_album_by_title(self, album_name: str) -> Optional[Dict]:
+        """
+        A method for looking up a loaded album by its name, ignoring case, accents and punctuation
+        """
+        self._first_page.wait()
+        return self.registry.get_by_title(album_name)
 
-    def get_album_id(self, album_name: str):
+    def get_album_id(self, album_name: str) -> Optional[str]:
         """
         A method for returning the album id given an album name
         """
-        assert self.albums
-        for album in self.albums:
-            if album_name == album["title"]:
-                return album["id"]
+        album = self.get_album_by_title(album_name)
+        return album["id"] if album else None
 
     def get_album_info(self, album_id) -> Dict:
         """
-        A method for retrieving album metadata given an album id
+        A method for retrieving album metadata given an album id, albums that have already been
+        listed are answered without a request
         """
-        return self.service.albums().get(albumId=album_id).execute()
+        if (album := self.registry.get(album_id)) is not None:
+            return album
 
-    def get_album_photos(self, album_id) -> List:
+        album = AlbumCatalogue.to_entry(self.service.albums().get(albumId=album_id).execute())
+        self.registry.add([album])
+        return album
+
+    def iter_album_photo_pages(self, album_id) -> Iterator[List[Dict]]:
         """
-        A method for retrieivng urls for all the photos in an album
+        A method for listing the photos in an album a page at a time, so each page can be worked
+        on before the next one has been listed.  Only the fields the photo sync reads are
+        requested.
         """
-        photos = []
-
         page_token = ""
-        loop = True
-        while loop:
+        while True:
             resp = (
                 self.service.mediaItems()
-                .search(body={"albumId": album_id, "pageToken": page_token, "pageSize": 50})
+                .search(
+                    body={
+                        "albumId": album_id,
+                        "pageToken": page_token,
+                        "pageSize": self.MEDIA_PAGE_SIZE,
+                    },
+                    fields=self.MEDIA_ITEM_FIELDS,
+                )
                 .execute()
             )
-            photos += resp["mediaItems"]
+            yield resp.get("mediaItems", [])
 
             page_token = resp.get("nextPageToken", "")
             if page_token == "":
-                loop = False
+                return
 
-        return photos
+    def get_album_photos(self, album_id) -> List:
+        """
+        A method for retrieivng urls for all the photos in an album
+        """
+        return [photo for page in self.iter_album_photo_pages(album_id) for photo in page]
 
-    def get_album_suggestions(self, albums: List, entry: str, n=5):
+    def get_download_url(self, media_item: Dict, max_size: int) -> str:
         """
-        A method for calculating the closest matching existing album names given a text entry
+        A method for building the download url of a photo.  Google Photos resizes the photo to
+        fit within max_size x max_size server side (=w{N}-h{N}), unless originals were asked for
+        (=d), which are often tens of MB and are shrunk to the same size afterwards anyway.
         """
-        albums = [(i["title"], i["id"]) for i in albums]
+        if self.download_originals:
+            return media_item["baseUrl"] + "=d"
+        return f"{media_item['baseUrl']}=w{max_size}-h{max_size}"
 
-        def fuzzy_match_rating(a):
-            return -fuzz.token_set_ratio(entry.lower(), a[0].lower())
+    def get_album_suggestions(self, entry: str, n=5) -> List[Tuple[str, str]]:
+        """
+        A method for finding the (title, id) of the n albums loaded so far whose names best match
+        a text entry
+        """
+        self._first_page.wait()
+        return self.search_index.search(entry, n)
 
-        return sorted(albums, key=fuzzy_match_rating)[:n]
+    def close(self) -> None:
+        """
+        A method for stopping the album listing after the page it's on
+        """
+        self._stop_listing.set()
+        self._listing_executor.shutdown(wait=False)
@@ -0,0 +1,142 @@
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+
+class LocalMirror:
+    """
+    A local SQLite copy of the single table store, keyed by PK/SK.  Entities are stored in
+    DynamoDB's typed JSON format so numbers come back as the same Decimals DynamoDB returns.
+
+    Each partition remembers when it was last synced and the newest write timestamp it has seen,
+    which lets DDBClient pull only the items written since then.
+    """
+
+    DEFAULT_SYNC_INTERVAL_SECONDS = 3600
+
+    def __init__(self, path: str, sync_interval: float = DEFAULT_SYNC_INTERVAL_SECONDS):
+        self.path = path
+        self.sync_interval = sync_interval
+
+        self._serializer = TypeSerializer()
+        self._deserializer = TypeDeserializer()
+
+        # The connection is shared with the photo worker threads, so access is serialized
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS items ("
+                "pk TEXT NOT NULL, sk TEXT NOT NULL, entity TEXT NOT NULL, "
+                "updated_at INTEGER NOT NULL DEFAULT 0, PRIMARY KEY (pk, sk))"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS partitions ("
+                "pk TEXT PRIMARY KEY, synced_at REAL NOT NULL, watermark INTEGER NOT NULL)"
+            )
+
+    def _dumps(self, entity: Dict[str, Any]) -> str:
+        return json.dumps(self._serializer.serialize(entity))
+
+    def _loads(self, data: str) -> Dict[str, Any]:
+        return self._deserializer.deserialize(json.loads(data))
+
+    def _partition(self, pk: str) -> Optional[Tuple[float, int]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT synced_at, watermark FROM partitions WHERE pk = ?", (pk,)
+            ).fetchone()
+
+    def is_synced(self, pk: str) -> bool:
+        """
+        A method for checking whether a partition has ever been copied into the mirror
+        """
+        return self._partition(pk) is not None
+
+    def needs_sync(self, pk: str) -> bool:
+        """
+        A method for checking whether a partition is missing or older than the sync interval
+        """
+        partition = self._partition(pk)
+        return partition is None or time.time() - partition[0] > self.sync_interval
+
+    def watermark(self, pk: str) -> int:
+        """
+        A method for retrieving the newest write timestamp that has been synced for a partition
+        """
+        partition = self._partition(pk)
+        return partition[1] if partition else 0
+
+    def mark_synced(self, pk: str, watermark: int) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO partitions (pk, synced_at, watermark) VALUES (?, ?, ?)",
+                (pk, time.time(), watermark),
+            )
+
+    def partitions(self) -> List[str]:
+        """
+        A method for listing the partitions that have been copied into the mirror
+        """
+        with self._lock:
+            return [pk for (pk,) in self._conn.execute("SELECT pk FROM partitions ORDER BY pk")]
+
+    def clear_partition(self, pk: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM items WHERE pk = ?", (pk,))
+            self._conn.execute("DELETE FROM partitions WHERE pk = ?", (pk,))
+
+    def upsert(self, items: Iterable[Tuple[str, str, Dict[str, Any], int]]) -> None:
+        """
+        A method for writing (pk, sk, entity, updated_at) records to the mirror
+        """
+        rows = [(pk, sk, self._dumps(entity), updated_at) for pk, sk, entity, updated_at in items]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO items (pk, sk, entity, updated_at) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete(self, pk: str, sk: Optional[str] = None) -> None:
+        with self._lock, self._conn:
+            if sk is None:
+                self._conn.execute("DELETE FROM items WHERE pk = ?", (pk,))
+            else:
+                self._conn.execute("DELETE FROM items WHERE pk = ? AND sk = ?", (pk, sk))
+
+    def _select(self, query: str, params: Tuple) -> Iterator[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        for (entity,) in rows:
+            yield self._loads(entity)
+
+    def iter_items(self, pk: str) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        A method for iterating over the (sk, entity) pairs of a partition, in sort key order
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT sk, entity FROM items WHERE pk = ? ORDER BY sk", (pk,)
+            ).fetchall()
+        for sk, entity in rows:
+            yield sk, self._loads(entity)
+
+    def iter_equals(self, pk: str, sk: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        if sk is None:
+            return self._select("SELECT entity FROM items WHERE pk = ? ORDER BY sk", (pk,))
+        return self._select("SELECT entity FROM items WHERE pk = ? AND sk = ?", (pk, sk))
+
+    def iter_begins_with(self, pk: str, prefix: str) -> Iterator[Dict[str, Any]]:
+        # substr() rather than LIKE, so '%' and '_' in keys aren't treated as wildcards
+        return self._select(
+            "SELECT entity FROM items WHERE pk = ? AND substr(sk, 1, ?) = ? ORDER BY sk",
+            (pk, len(prefix), prefix),
+        )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,71 @@
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from cachetools import TTLCache
+
+# (partition key, sort key, whether the sort key is a prefix, projected attributes)
+CacheKey = Tuple[str, Optional[str], bool, Tuple[str, ...]]
+
+
+class QueryCache:
+    """
+    A read-through cache of DynamoDB query results, keyed by partition key and sort key (prefix).
+    Entries expire after `ttl` seconds, the least recently used entries are evicted beyond
+    `max_entries`, and writes invalidate every cached query that could contain the written key.
+
+    Each partition key has a generation that invalidating it bumps.  A query whose partition
+    was invalidated while it was running isn't cached, since it may have read the old data.
+    """
+
+    DEFAULT_TTL_SECONDS = 300
+    DEFAULT_MAX_ENTRIES = 256
+
+    def __init__(self, ttl: float = DEFAULT_TTL_SECONDS, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self._cache: TTLCache = TTLCache(maxsize=max_entries, ttl=ttl)
+        self._lock = threading.Lock()
+        self._generations: Dict[str, int] = {}
+        self._cleared = 0
+
+    @staticmethod
+    def make_key(
+        pk: str, sk: Optional[str], prefix: bool, attributes: Optional[List[str]]
+    ) -> CacheKey:
+        return (pk, sk, prefix, tuple(attributes or ()))
+
+    def get_or_load(self, key: CacheKey, loader: Callable[[], List[Any]]) -> List[Any]:
+        """
+        A method for returning the cached result of a query, running the query on a miss
+        """
+        with self._lock:
+            result = self._cache.get(key)
+            generation = (self._cleared, self._generations.get(key[0], 0))
+
+        if result is None:
+            result = loader()
+            with self._lock:
+                if generation == (self._cleared, self._generations.get(key[0], 0)):
+                    self._cache[key] = result
+
+        # Hand out a copy so callers can't modify what's cached
+        return list(result)
+
+    def invalidate(self, pk: str, sk: Optional[str] = None) -> None:
+        """
+        A method for dropping cached queries that a write to (pk, sk) may have changed
+        """
+        with self._lock:
+            self._generations[pk] = self._generations.get(pk, 0) + 1
+            for key in list(self._cache.keys()):
+                cached_pk, cached_sk, prefix, _ = key
+                if cached_pk != pk:
+                    continue
+
+                if sk is None or cached_sk is None or sk == cached_sk:
+                    self._cache.pop(key, None)
+                elif prefix and sk.startswith(cached_sk):
+                    self._cache.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cleared += 1
+            self._cache.clear()
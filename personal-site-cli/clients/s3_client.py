@@ -1,7 +1,9 @@
 from io import BytesIO
+from typing import Set
 
 import botocore
 from boto3 import Session
+from botocore.config import Config
 from mypy_boto3_s3.service_resource import S3ServiceResource
 from mypy_boto3_s3.type_defs import PutObjectOutputTypeDef
 
@@ -10,8 +12,18 @@ class S3Client:
     IMAGE_DIRECTORY = "images"
     THUMBNAIL_DIRECTORY = "thumbnails"
 
-    def __init__(self, session: Session, bucket_name: str):
-        self._s3_resource: S3ServiceResource = session.resource("s3")
+    MAX_POOL_CONNECTIONS = 16
+
+    def __init__(
+        self,
+        session: Session,
+        bucket_name: str,
+        max_pool_connections: int = MAX_POOL_CONNECTIONS,
+    ):
+        self.max_pool_connections = max_pool_connections
+        self._s3_resource: S3ServiceResource = session.resource(
+            "s3", config=Config(max_pool_connections=max_pool_connections)
+        )
         self.bucket_name = bucket_name
         self.region = session.region_name
         self.base_url = "https://{}.s3.{}.amazonaws.com".format(self.bucket_name, self.region)
@@ -26,12 +38,24 @@ class S3Client:
             " ", "_"
         )
 
-    def write_image_to_s3(self, file_name: str, img: BytesIO, **kwargs) -> str:
+    def generate_s3_path_for_rendition(
+        self, destination_id: str, place_id: str, max_size: int, file_name: str
+    ) -> str:
+        return f"{self.IMAGE_DIRECTORY}/{destination_id}/{place_id}/{max_size}/{file_name}".replace(
+            " ", "_"
+        )
+
+    def get_url(self, file_name: str) -> str:
+        return f"{self.base_url}/{file_name}"
+
+    def write_image_to_s3(
+        self, file_name: str, img: BytesIO, content_type: str = "image/png", **kwargs
+    ) -> str:
         resp: PutObjectOutputTypeDef = self._s3_resource.Object(self.bucket_name, file_name).put(
-            Body=img, **kwargs
+            Body=img, ContentType=content_type, **kwargs
         )
         assert resp["ResponseMetadata"]["HTTPStatusCode"], "Image Upload Failed"
-        return f"{self.base_url}/{file_name}"
+        return self.get_url(file_name)
 
     def does_image_exist(self, file_name: str) -> bool:
         try:
@@ -39,5 +63,13 @@ class S3Client:
         except botocore.exceptions.ClientError as e:
             if e.response["Error"]["Code"] == "404":
                 return False
-        finally:
-            return True
+            raise
+        return True
+
+    def list_existing_keys(self, prefix: str) -> Set[str]:
+        """
+        A method for retrieving every key under a prefix, a page of up to 1000 keys per request,
+        so that many existence checks cost a single listing instead of a HEAD request each
+        """
+        bucket = self._s3_resource.Bucket(self.bucket_name)
+        return {obj.key for obj in bucket.objects.filter(Prefix=prefix)}
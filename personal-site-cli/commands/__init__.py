@@ -0,0 +1,3 @@
+from .migrate import migrate_travel_to_item_collections  # noqa F401
+from .backup import backup_table  # noqa F401
+from .restore import import_backup, import_csv  # noqa F401
@@ -0,0 +1,126 @@
+import datetime
+import gzip
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Dict, List
+
+from clients import DDBClient
+
+try:
+    import zstandard
+except ImportError:  # zstd compression is optional
+    zstandard = None  # type: ignore[assignment]
+
+MANIFEST_FILE_NAME = "manifest.json"
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst", "none": ""}
+DEFAULT_SEGMENTS = 4
+
+
+class _HashingWriter:
+    """
+    A file wrapper that computes the sha256 and size of everything written through it
+    """
+
+    def __init__(self, fileobj: IO[bytes]):
+        self._fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.sha256.update(data)
+        self.size += len(data)
+        return self._fileobj.write(data)
+
+    def flush(self) -> None:
+        self._fileobj.flush()
+
+    def __enter__(self) -> "_HashingWriter":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.flush()
+
+
+def open_compressed_writer(fileobj: Any, compression: str) -> IO[bytes]:
+    """
+    A function for wrapping a file so that everything written to it is compressed.  Closing the
+    returned writer leaves the underlying file open.
+    """
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="wb")  # type: ignore[return-value]
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        return zstandard.ZstdCompressor().stream_writer(fileobj, closefd=False)
+    return fileobj
+
+
+def shard_file_name(segment: int, total_segments: int, compression: str) -> str:
+    return (
+        f"segment-{segment:04}-of-{total_segments:04}.ndjson{COMPRESSION_EXTENSIONS[compression]}"
+    )
+
+
+def _backup_segment(
+    ddb_client: DDBClient, output_dir: str, segment: int, total_segments: int, compression: str
+) -> Dict[str, Any]:
+    """
+    A function for streaming one Scan segment into a compressed NDJSON shard, one item per line
+    """
+    file_name = shard_file_name(segment, total_segments, compression)
+
+    items = 0
+    with open(os.path.join(output_dir, file_name), "wb") as raw:
+        hashing_writer = _HashingWriter(raw)
+        with open_compressed_writer(hashing_writer, compression) as writer:
+            for item in ddb_client.iter_scan_segment(segment, total_segments):
+                writer.write(json.dumps(item, separators=(",", ":")).encode() + b"\n")
+                items += 1
+
+    return {
+        "file": file_name,
+        "segment": segment,
+        "items": items,
+        "bytes": hashing_writer.size,
+        "sha256": hashing_writer.sha256.hexdigest(),
+    }
+
+
+def backup_table(
+    ddb_client: DDBClient,
+    output_dir: str,
+    segments: int = DEFAULT_SEGMENTS,
+    compression: str = "gzip",
+) -> Dict[str, Any]:
+    """
+    A function for backing up the table with a parallel segmented Scan.  Each segment is scanned by
+    its own worker and streamed into its own shard, so memory use doesn't grow with the table.  A
+    manifest with the item count and checksum of every shard is written next to the shards.
+    """
+    if compression not in COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Unknown compression: {compression}")
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        futures = [
+            executor.submit(_backup_segment, ddb_client, output_dir, segment, segments, compression)
+            for segment in range(segments)
+        ]
+        shards: List[Dict[str, Any]] = [future.result() for future in futures]
+
+    manifest = {
+        "table_name": ddb_client.table_name,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "format": "dynamodb-json",
+        "compression": compression,
+        "total_segments": segments,
+        "total_items": sum(shard["items"] for shard in shards),
+        "shards": shards,
+    }
+    with open(os.path.join(output_dir, MANIFEST_FILE_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
@@ -0,0 +1,67 @@
+from typing import Dict
+
+from cli import TravelCLI
+from clients import DDBClient, TravelEntities
+
+
+def migrate_travel_to_item_collections(ddb_client: DDBClient) -> Dict[str, int]:
+    """
+    A function for copying the per-entity Travel partitions into per-Destination item collections,
+    then marking each collection as complete.  The original records are left in place, and
+    re-running the migration simply overwrites the copies with the current records.  Returns the
+    number of records copied per entity type.
+    """
+    counts = {
+        TravelEntities.DESTINATION: 0,
+        TravelEntities.PLACE: 0,
+        TravelEntities.ALBUM: 0,
+        TravelEntities.PHOTO: 0,
+    }
+
+    def collection_pk(destination_id: str) -> str:
+        return TravelCLI.COLLECTION_PK_FS.format(destination_id=destination_id)
+
+    destination_ids = []
+    with ddb_client.batch_writer() as writer:
+        for entity in ddb_client.iter_equals(TravelCLI.DESTINATION_PK):
+            writer.put(
+                collection_pk(entity["place_id"]), TravelCLI.COLLECTION_DESTINATION_SK, entity
+            )
+            destination_ids.append(entity["place_id"])
+            counts[TravelEntities.DESTINATION] += 1
+
+        for entity in ddb_client.iter_equals(TravelCLI.PLACE_PK):
+            writer.put(
+                collection_pk(entity["destination_id"]),
+                TravelCLI.COLLECTION_PLACE_SK_FS.format(place_id=entity["place_id"]),
+                entity,
+            )
+            counts[TravelEntities.PLACE] += 1
+
+        for entity in ddb_client.iter_equals(TravelCLI.ALBUM_PK):
+            writer.put(
+                collection_pk(entity["destination_id"]),
+                TravelCLI.COLLECTION_ALBUM_SK_FS.format(
+                    place_id=entity["place_id"], album_id=entity["album_id"]
+                ),
+                entity,
+            )
+            counts[TravelEntities.ALBUM] += 1
+
+        for entity in ddb_client.iter_equals(TravelCLI.PHOTO_PK):
+            writer.put(
+                collection_pk(entity["destination_id"]),
+                TravelCLI.COLLECTION_PHOTO_SK_FS.format(
+                    place_id=entity["place_id"], photo_id=entity["photo_id"]
+                ),
+                entity,
+            )
+            counts[TravelEntities.PHOTO] += 1
+
+    # Only once every record has been copied are the collections marked as complete, so an
+    # interrupted migration leaves the per-entity partitions in use
+    with ddb_client.batch_writer() as writer:
+        for destination_id in destination_ids:
+            writer.put(collection_pk(destination_id), TravelCLI.COLLECTION_COMPLETE_SK, {})
+
+    return counts
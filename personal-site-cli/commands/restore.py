@@ -0,0 +1,271 @@
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Type
+
+from boto3.dynamodb.types import TypeDeserializer
+from cli import TravelCLI
+from cli.home_cli import HomeCLI
+from cli.resume_cli import ResumeCLI
+from clients import DDBClient, Namespaces, TravelEntities
+from models.home import Photo as HomePhoto
+from models.resume import Education, Job, Skill
+from models.travel import Album, Destination, Photo, Place
+from utils.throttling import ConcurrencyLimiter
+
+from .backup import MANIFEST_FILE_NAME, zstandard
+
+DEFAULT_WORKERS = 8
+PROGRESS_INTERVAL_ITEMS = 5000
+# A throttled chunk is retried this many times, backing off each time, before the import fails
+MAX_THROTTLED_RETRIES = 10
+
+MODELS_BY_PARTITION: Dict[str, Type] = {
+    TravelCLI.DESTINATION_PK: Destination,
+    TravelCLI.PLACE_PK: Place,
+    TravelCLI.ALBUM_PK: Album,
+    TravelCLI.PHOTO_PK: Photo,
+    ResumeCLI.JOB_PK: Job,
+    ResumeCLI.EDUCATION_PK: Education,
+    ResumeCLI.SKILL_PK: Skill,
+    HomeCLI.PHOTO_PK: HomePhoto,
+}
+
+# Models for the entities of a Destination's item collection, by sort key prefix
+MODELS_BY_COLLECTION_ENTITY: Dict[str, Type] = {
+    TravelEntities.DESTINATION: Destination,
+    TravelEntities.PLACE: Place,
+    TravelEntities.ALBUM: Album,
+    TravelEntities.PHOTO: Photo,
+}
+
+CSV_ENTITIES = {"destination": Destination, "place": Place}
+
+
+class _HashingReader(io.RawIOBase):
+    """
+    A file wrapper that computes the sha256 of everything read through it
+    """
+
+    def __init__(self, fileobj: IO[bytes]):
+        self._fileobj = fileobj
+        self.sha256 = hashlib.sha256()
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        data = self._fileobj.read(len(buffer))
+        self.sha256.update(data)
+        buffer[: len(data)] = data
+        return len(data)
+
+
+def open_compressed_reader(fileobj: Any, compression: str) -> IO[bytes]:
+    """
+    A function for wrapping a file so that reading from it decompresses its contents, line by
+    line if needed
+    """
+    if compression == "gzip":
+        return gzip.GzipFile(fileobj=fileobj, mode="rb")  # type: ignore[return-value]
+    if compression == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+        fileobj = zstandard.ZstdDecompressor().stream_reader(fileobj, closefd=False)
+    return io.BufferedReader(fileobj)
+
+
+def iter_backup_items(backup_dir: str) -> Iterator[Dict[str, Any]]:
+    """
+    A generator that streams the items of a backup, shard by shard.  Each shard's item count and
+    checksum are checked against the manifest once the shard has been read.
+    """
+    with open(os.path.join(backup_dir, MANIFEST_FILE_NAME)) as f:
+        manifest = json.load(f)
+
+    deserializer = TypeDeserializer()
+    for shard in manifest["shards"]:
+        items = 0
+        with open(os.path.join(backup_dir, shard["file"]), "rb") as raw:
+            hashing_reader = _HashingReader(raw)
+            reader = open_compressed_reader(hashing_reader, manifest["compression"])
+            for line in reader:
+                item = json.loads(line)
+                yield {key: deserializer.deserialize(value) for key, value in item.items()}
+                items += 1
+
+            # Make sure any bytes the decompressor didn't need are still counted in the checksum
+            while hashing_reader.read(1 << 20):
+                pass
+
+        if items != shard["items"]:
+            raise ValueError(f"{shard['file']} has {items} items, expected {shard['items']}")
+        if hashing_reader.sha256.hexdigest() != shard["sha256"]:
+            raise ValueError(f"{shard['file']} does not match its checksum")
+
+
+def iter_csv_items(
+    path: str, entity: str, on_invalid: Callable[[str, Exception], None]
+) -> Iterator[Dict[str, Any]]:
+    """
+    A generator that turns the rows of a CSV of Destinations or Places into table items, both for
+    the per-entity partitions and for the Destination's item collection.  Rows that aren't valid
+    are passed to on_invalid and skipped.
+    """
+    model = CSV_ENTITIES[entity]
+
+    with open(path, newline="") as f:
+        for line_number, row in enumerate(csv.DictReader(f), start=2):
+            try:
+                obj = model(**row)
+            except (TypeError, ArithmeticError) as e:
+                on_invalid(f"{path}:{line_number}", ValueError(f"Invalid {model.__name__}: {e}"))
+                continue
+            if model is Destination:
+                yield _make_item(TravelCLI.DESTINATION_PK, obj.place_id, obj.asdict())
+                collection_sk = TravelCLI.COLLECTION_DESTINATION_SK
+                destination_id = obj.place_id
+            else:
+                yield _make_item(
+                    TravelCLI.PLACE_PK,
+                    TravelCLI.PLACE_SK_FS.format(
+                        destination_id=obj.destination_id, place_id=obj.place_id
+                    ),
+                    obj.asdict(),
+                )
+                collection_sk = TravelCLI.COLLECTION_PLACE_SK_FS.format(place_id=obj.place_id)
+                destination_id = obj.destination_id
+
+            yield _make_item(
+                TravelCLI.COLLECTION_PK_FS.format(destination_id=destination_id),
+                collection_sk,
+                obj.asdict(),
+            )
+
+
+def _make_item(pk: str, sk: str, entity: Dict[str, Any]) -> Dict[str, Any]:
+    return {DDBClient.PARTITION_KEY: pk, DDBClient.SORT_KEY: sk, DDBClient.ENTITY: entity}
+
+
+def model_for_item(item: Dict[str, Any]) -> Optional[Type]:
+    pk, sk = item[DDBClient.PARTITION_KEY], item[DDBClient.SORT_KEY]
+    if pk in MODELS_BY_PARTITION:
+        return MODELS_BY_PARTITION[pk]
+    if pk.startswith(f"{Namespaces.TRAVEL}#"):
+        return MODELS_BY_COLLECTION_ENTITY.get(sk.split("#", 1)[0])
+    return None
+
+
+def validate_item(item: Dict[str, Any]) -> None:
+    """
+    A function for checking that an item's entity can be loaded into its model, raises a
+    ValueError if it can't
+    """
+    model = model_for_item(item)
+    if model is None:
+        raise ValueError(f"No model for {item.get(DDBClient.PARTITION_KEY)}")
+
+    try:
+        model(**item[DDBClient.ENTITY])
+    except (KeyError, TypeError, ArithmeticError) as e:
+        raise ValueError(f"Invalid {model.__name__}: {e}")
+
+
+class _ImportStats:
+    def __init__(self) -> None:
+        self.written = 0
+        self.invalid = 0
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def items_per_second(self) -> float:
+        return self.written / max(time.monotonic() - self.started, 1e-9)
+
+    def skip(self, description: str, error: Exception) -> None:
+        with self._lock:
+            self.invalid += 1
+        print(f"Skipping {description}: {error}")
+
+    def add_written(self, count: int) -> None:
+        with self._lock:
+            before = self.written
+            self.written += count
+            if before // PROGRESS_INTERVAL_ITEMS != self.written // PROGRESS_INTERVAL_ITEMS:
+                print(f"Imported {self.written} items ({self.items_per_second:.0f} items/sec)")
+
+
+def import_items(
+    ddb_client: DDBClient,
+    items: Iterator[Dict[str, Any]],
+    workers: int = DEFAULT_WORKERS,
+    stats: Optional[_ImportStats] = None,
+) -> Dict[str, Any]:
+    """
+    A function for validating items and writing them through a pool of concurrent BatchWriteItem
+    workers.  When DynamoDB reports throttling, fewer writes are let through at once and the
+    throttled ones are retried with backoff, growing back as writes succeed.  Returns the number
+    of items written and rejected, and the write rate.
+    """
+    limiter = ConcurrencyLimiter(
+        "import", initial=workers, maximum=workers, max_retries=MAX_THROTTLED_RETRIES
+    )
+    stats = stats or _ImportStats()
+    # Bounds the chunks waiting for a worker, so memory doesn't grow with the size of the import
+    in_flight = threading.BoundedSemaphore(workers * 2)
+
+    def write(chunk: List[Dict[str, Any]]) -> None:
+        try:
+            limiter.call(ddb_client.batch_put_items, chunk)
+            stats.add_written(len(chunk))
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = []
+        chunk: List[Dict[str, Any]] = []
+        for item in items:
+            try:
+                validate_item(item)
+            except ValueError as e:
+                stats.skip(str(item.get(DDBClient.SORT_KEY)), e)
+                continue
+
+            chunk.append(item)
+            if len(chunk) == DDBClient.BATCH_WRITE_SIZE:
+                in_flight.acquire()
+                futures.append(executor.submit(write, chunk))
+                chunk = []
+
+        if chunk:
+            in_flight.acquire()
+            futures.append(executor.submit(write, chunk))
+
+        for future in futures:
+            future.result()
+
+    return {
+        "written": stats.written,
+        "invalid": stats.invalid,
+        "throttled": limiter.throttled,
+        "items_per_second": stats.items_per_second,
+    }
+
+
+def import_backup(
+    ddb_client: DDBClient, backup_dir: str, workers: int = DEFAULT_WORKERS
+) -> Dict[str, Any]:
+    return import_items(ddb_client, iter_backup_items(backup_dir), workers)
+
+
+def import_csv(
+    ddb_client: DDBClient, path: str, entity: str, workers: int = DEFAULT_WORKERS
+) -> Dict[str, Any]:
+    stats = _ImportStats()
+    return import_items(ddb_client, iter_csv_items(path, entity, stats.skip), workers, stats)
@@ -8,3 +8,11 @@ class InvalidStateException(PersonalSiteCLIException):
 
 class DynamoDBException(PersonalSiteCLIException):
     """Raised when a DynamoDB operation fails"""
+
+
+class ItemAlreadyExistsException(DynamoDBException):
+    """Raised when a conditional write finds that the item already exists"""
+
+
+class DynamoDBThrottlingException(DynamoDBException):
+    """Raised when DynamoDB keeps leaving a batch write's items unprocessed"""
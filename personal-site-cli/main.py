@@ -1,47 +1,236 @@
 #! /usr/bin/env python3
 
+import argparse
 import asyncio
 import os
+from typing import cast
 
 import boto3
 
 from cli import PersonalSiteCLI
-from clients import DDBClient, GoogleMapsClient, GooglePhotosClient, S3Client
+from clients import (
+    AlbumCatalogue,
+    AsyncDDBClient,
+    AsyncS3Client,
+    DDBClient,
+    Downloader,
+    GoogleMapsClient,
+    GooglePhotosClient,
+    LocalMirror,
+    QueryCache,
+    S3Client,
+)
+from commands import (
+    backup_table,
+    import_backup,
+    import_csv,
+    migrate_travel_to_item_collections,
+)
 from conf.config import Config
+from utils.executors import HybridExecutor
+from utils.lazy import Lazy
 
 ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_MIRROR_PATH = os.path.join(ROOT_DIR, "mirror.sqlite3")
+DEFAULT_ALBUM_CATALOGUE_PATH = os.path.join(ROOT_DIR, "albums.json")
 
 
-async def main() -> None:
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Add data to michaeljscully.com")
+    parser.add_argument(
+        "--mirror",
+        nargs="?",
+        const=DEFAULT_MIRROR_PATH,
+        help="Read DynamoDB through a local SQLite mirror, stored at this path",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help=(
+            "Browse the local mirror without contacting DynamoDB, writes are disabled and Google "
+            "is only contacted by the menus that need it"
+        ),
+    )
+    parser.add_argument(
+        "--resync",
+        action="store_true",
+        help=(
+            "Rebuild the local mirror from DynamoDB before starting, picking up items other "
+            "writers deleted"
+        ),
+    )
+
+    parser.add_argument(
+        "--album-ttl",
+        type=float,
+        default=24,
+        help=(
+            "Hours before the cached Google Photos album list is refreshed in the background. "
+            "The refresh stops at the first page of albums already cached unchanged"
+        ),
+    )
+    parser.add_argument(
+        "--album-full-refresh",
+        type=float,
+        default=168,
+        help=(
+            "Hours before the background refresh lists every album again, catching albums "
+            "deleted or changed past where the refreshes stop early"
+        ),
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        default=1536,
+        help="MB of decoded photos that may be in flight while syncing photos",
+    )
+    parser.add_argument(
+        "--originals",
+        action="store_true",
+        help="Download full resolution originals from Google Photos instead of resized photos",
+    )
+
+    # Without a command the interactive CLI is started
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser(
+        "migrate", help="Copy the Travel records into per-Destination item collections"
+    )
+
+    backup = commands.add_parser("backup", help="Export the table to compressed NDJSON shards")
+    backup.add_argument("output_dir", help="The directory to write the shards and manifest to")
+    backup.add_argument(
+        "--segments", type=int, default=4, help="The number of parallel Scan segments"
+    )
+    backup.add_argument("--compression", choices=["gzip", "zstd", "none"], default="gzip")
+
+    restore = commands.add_parser(
+        "import", help="Load a backup, or a CSV of Destinations or Places, into the table"
+    )
+    restore.add_argument("source", help="A backup directory, or a CSV file when --csv is given")
+    restore.add_argument(
+        "--csv",
+        choices=["destination", "place"],
+        help="Treat the source as a CSV of this entity type, with one column per field",
+    )
+    restore.add_argument(
+        "--workers", type=int, default=8, help="The number of concurrent BatchWriteItem workers"
+    )
+
+    return parser.parse_args()
+
+
+async def main(args: argparse.Namespace) -> None:
     # Retrieving keys from config file
     config_path = os.path.join(ROOT_DIR + "/conf/config.yaml")
     assert os.path.exists(config_path)
 
     config = Config(config_path)
 
+    session = boto3.Session(region_name=config.config["AWS"]["region_name"])
+
+    mirror_path = args.mirror or (DEFAULT_MIRROR_PATH if args.offline or args.resync else None)
+    ddb_client = DDBClient(
+        session,
+        config.config["AWS"]["table_name"],
+        # Menus re-read the same destinations and places many times, so queries are cached until
+        # they expire or a write touches them
+        cache=QueryCache(),
+        mirror=LocalMirror(mirror_path) if mirror_path else None,
+        offline=args.offline,
+    )
+
+    if args.resync:
+        partitions = ddb_client.resync_mirror()
+        print(f"Resynced {len(partitions)} partitions of the local mirror")
+
+    if args.command == "migrate":
+        counts = migrate_travel_to_item_collections(ddb_client)
+        for entity_type, count in counts.items():
+            print(f"Copied {count} {entity_type} records")
+        return
+
+    if args.command == "backup":
+        manifest = backup_table(ddb_client, args.output_dir, args.segments, args.compression)
+        print(f"Backed up {manifest['total_items']} items to {args.output_dir}")
+        return
+
+    if args.command == "import":
+        if args.csv:
+            stats = import_csv(ddb_client, args.source, args.csv, args.workers)
+        else:
+            stats = import_backup(ddb_client, args.source, args.workers)
+        print(
+            f"Imported {stats['written']} items, skipped {stats['invalid']} invalid items "
+            f"({stats['items_per_second']:.0f} items/sec, throttled {stats['throttled']} times)"
+        )
+        return
+
     # Instantiating Google Photos class
     GOOGLE_PHOTOS_SCOPES = ["https://www.googleapis.com/auth/photoslibrary.readonly"]
-    google_photos_client = GooglePhotosClient(config.config["GOOGLE"], GOOGLE_PHOTOS_SCOPES)
+
+    def create_google_photos_client() -> GooglePhotosClient:
+        return GooglePhotosClient(
+            config.config["GOOGLE"],
+            GOOGLE_PHOTOS_SCOPES,
+            download_originals=args.originals,
+            # Albums are searchable straight away from the last listing, which is refreshed once
+            # stale
+            catalogue=AlbumCatalogue(
+                DEFAULT_ALBUM_CATALOGUE_PATH,
+                ttl=args.album_ttl * 3600,
+                full_refresh_age=args.album_full_refresh * 3600,
+            ),
+        )
 
     # Instantiating Google Maps class
-    google_maps_client = GoogleMapsClient(api_key=config.config["GOOGLE"]["api_key"])
+    def create_google_maps_client() -> GoogleMapsClient:
+        return GoogleMapsClient(api_key=config.config["GOOGLE"]["api_key"])
+
+    # Creating the Google Photos client refreshes its token, fetches the API's discovery document
+    # and starts listing albums, so offline the Google clients are only created if a menu that
+    # needs them is used
+    google_photos_client: GooglePhotosClient
+    google_maps_client: GoogleMapsClient
+    if args.offline:
+        google_photos_client = cast(GooglePhotosClient, Lazy(create_google_photos_client))
+        google_maps_client = cast(GoogleMapsClient, Lazy(create_google_maps_client))
+    else:
+        google_photos_client = create_google_photos_client()
+        google_maps_client = create_google_maps_client()
 
-    session = boto3.Session(region_name=config.config["AWS"]["region_name"])
     s3_client = S3Client(
         session,
         bucket_name=config.config["AWS"]["photos_bucket"],
     )
 
-    ddb_client = DDBClient(session, config.config["AWS"]["table_name"])
+    # Executor-backed facades, so the menus can await AWS calls without blocking the event loop
+    async_s3_client = AsyncS3Client(s3_client)
+    async_ddb_client = AsyncDDBClient(ddb_client)
+    # Photo syncs download and upload on its threads and resize/encode on its processes
+    executor = HybridExecutor(memory_budget=args.memory_budget * 1024 * 1024)
+    # One connection pool for every photo download, so connections are reused between photos
+    downloader = Downloader()
 
     cli = PersonalSiteCLI(
         google_maps_client=google_maps_client,
         google_photos_client=google_photos_client,
         s3_client=s3_client,
         ddb_client=ddb_client,
+        async_s3_client=async_s3_client,
+        async_ddb_client=async_ddb_client,
+        executor=executor,
+        downloader=downloader,
     )
-    await cli.run()
+    try:
+        await cli.run()
+    finally:
+        if not isinstance(google_photos_client, Lazy) or google_photos_client.created:
+            google_photos_client.close()
+        executor.shutdown()
+        downloader.close()
+        async_s3_client.close()
+        async_ddb_client.close()
 
 
 if __name__ == "__main__":
-    asyncio.get_event_loop().run_until_complete(main())
+    asyncio.get_event_loop().run_until_complete(main(parse_args()))
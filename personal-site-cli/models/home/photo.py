@@ -16,3 +16,5 @@ class Photo:
     height: Decimal = field(converter=convert_to_decimal)
     width: Decimal = field(converter=convert_to_decimal)
     hsh: str
+    # The Google Photos filename, used with creation_timestamp to recognise re-uploaded photos
+    filename: str = ""
@@ -2,3 +2,4 @@ from .destination import Destination  # noqa F401
 from .place import Place  # noqa F401
 from .album import Album  # noqa F401
 from .photo import Photo  # noqa F401
+from .destination_tree import DestinationTree  # noqa F401
@@ -0,0 +1,24 @@
+from typing import List, Optional
+
+from attrs import field, frozen
+
+from .album import Album
+from .destination import Destination
+from .photo import Photo
+from .place import Place
+
+
+@frozen()
+class DestinationTree:
+    destination: Optional[Destination]
+    places: List[Place] = field(factory=list)
+    albums: List[Album] = field(factory=list)
+    photos: List[Photo] = field(factory=list)
+    # Whether the collection holds every record of the Destination, see TravelCLI
+    complete: bool = False
+
+    def albums_for(self, place: Place) -> List[Album]:
+        return [album for album in self.albums if album.place_id == place.place_id]
+
+    def photos_for(self, place: Place) -> List[Photo]:
+        return [photo for photo in self.photos if photo.place_id == place.place_id]
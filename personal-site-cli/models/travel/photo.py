@@ -1,4 +1,5 @@
 from decimal import Decimal
+from typing import Dict
 
 from attrs import asdict, field, frozen
 
@@ -19,6 +20,10 @@ class Photo:
     width: Decimal = field(converter=convert_to_decimal)
     hsh: str
     thumbnail_src: str
+    # The Google Photos filename, used with creation_timestamp to recognise re-uploaded photos
+    filename: str = ""
+    # URLs of every rendition of the photo, keyed by max size, for the site's srcset
+    srcset: Dict[str, str] = field(factory=dict)
 
     def asdict(self):
         return asdict(self)
@@ -0,0 +1,74 @@
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+from utils.album_search import normalize_title
+
+
+class AlbumRegistry:
+    """
+    The Google Photos albums loaded so far, keyed by id and by normalized title, in the order
+    Google Photos lists them.  Several albums can share a title, a lookup by title returns the
+    first one listed.
+    """
+
+    def __init__(self, albums: Iterable[Dict] = ()):
+        self._lock = threading.Lock()
+        self._by_id: Dict[str, Dict] = {}
+        self._by_title: Dict[str, List[str]] = {}
+        self.add(albums)
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, album_id: str) -> bool:
+        return album_id in self._by_id
+
+    def _unlink_title(self, album: Dict) -> None:
+        title = normalize_title(album.get("title", ""))
+        ids = self._by_title.get(title, [])
+        if album["id"] in ids:
+            ids.remove(album["id"])
+        if not ids:
+            self._by_title.pop(title, None)
+
+    def add(self, albums: Iterable[Dict]) -> None:
+        """
+        A method for adding albums, or updating the albums already registered under their ids
+        """
+        with self._lock:
+            for album in albums:
+                if (existing := self._by_id.get(album["id"])) is not None:
+                    self._unlink_title(existing)
+                self._by_id[album["id"]] = album
+                self._by_title.setdefault(normalize_title(album.get("title", "")), []).append(
+                    album["id"]
+                )
+
+    def replace(self, albums: Iterable[Dict]) -> Set[str]:
+        """
+        A method for swapping in a complete listing of albums, returns the ids of the albums
+        that aren't in it any more
+        """
+        registry = AlbumRegistry(albums)
+        with self._lock:
+            dropped = self._by_id.keys() - registry._by_id.keys()
+            self._by_id = registry._by_id
+            self._by_title = registry._by_title
+        return dropped
+
+    def get(self, album_id: str) -> Optional[Dict]:
+        with self._lock:
+            return self._by_id.get(album_id)
+
+    def get_by_title(self, title: str) -> Optional[Dict]:
+        with self._lock:
+            ids = self._by_title.get(normalize_title(title))
+            return self._by_id[ids[0]] if ids else None
+
+    def values(self) -> List[Dict]:
+        with self._lock:
+            return list(self._by_id.values())
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return dict(self._by_id)
@@ -0,0 +1,127 @@
+import heapq
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, Set, Tuple
+
+from fuzzywuzzy import fuzz
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_title(title: str) -> str:
+    """
+    Lowercases a title, strips accents and punctuation and collapses whitespace, so that
+    "São Paulo -- Día 1" and "sao paulo dia 1" normalize to the same string
+    """
+    decomposed = unicodedata.normalize("NFKD", title)
+    ascii_title = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(_NON_WORD.sub(" ", ascii_title.lower()).split())
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    The character trigrams of each word in text, with the words padded so that short words
+    and word starts still produce trigrams
+    """
+    grams: Set[str] = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i : i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class AlbumSearchIndex:
+    """
+    A fuzzy search over album titles.  Titles are normalized once as albums are added, and a
+    trigram index narrows each query down to the albums whose trigrams are most similar to its
+    own (by Dice coefficient, so long titles aren't favoured just for having more trigrams), so
+    only those few are scored with fuzz.token_set_ratio and the best n picked with a heap.
+
+    Albums can be added while the index is being searched.
+    """
+
+    # How many of the albums with the most similar trigrams to a query are scored
+    MAX_CANDIDATES = 100
+
+    def __init__(self, albums: Iterable[Dict] = ()):
+        self._lock = threading.Lock()
+        # Indexed by position, so the trigram postings can be lists of ints
+        self._ids: List[str] = []
+        self._titles: List[str] = []
+        self._normalized: List[str] = []
+        self._gram_counts: List[int] = []
+        self._positions: Dict[str, int] = {}
+        self._postings: Dict[str, List[int]] = {}
+        self.add(albums)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, albums: Iterable[Dict]) -> None:
+        """
+        A method for indexing albums from the Google Photos API, re-adding an album updates its
+        title
+        """
+        with self._lock:
+            for album in albums:
+                normalized = normalize_title(album.get("title", ""))
+                position = self._positions.get(album["id"])
+                if position is not None:
+                    if self._normalized[position] == normalized:
+                        self._titles[position] = album.get("title", "")
+                        continue
+                    # The album was renamed, so its old trigrams no longer point at it
+                    for gram in trigrams(self._normalized[position]):
+                        self._postings[gram].remove(position)
+                else:
+                    position = len(self._ids)
+                    self._positions[album["id"]] = position
+                    self._ids.append(album["id"])
+                    self._titles.append("")
+                    self._normalized.append("")
+                    self._gram_counts.append(0)
+
+                self._titles[position] = album.get("title", "")
+                self._normalized[position] = normalized
+                grams = trigrams(normalized)
+                self._gram_counts[position] = len(grams)
+                for gram in grams:
+                    self._postings.setdefault(gram, []).append(position)
+
+    def _candidates(self, query: str) -> List[int]:
+        grams = trigrams(query)
+        overlap: Counter = Counter()
+        for gram in grams:
+            overlap.update(self._postings.get(gram, ()))
+
+        if not overlap:
+            # Nothing shares a trigram with the query, fall back to scoring every album
+            return list(range(len(self._ids)))
+
+        def dice(entry: Tuple[int, int]) -> float:
+            position, shared = entry
+            return 2 * shared / (len(grams) + self._gram_counts[position])
+
+        return [
+            position
+            for position, _ in heapq.nlargest(self.MAX_CANDIDATES, overlap.items(), key=dice)
+        ]
+
+    def search(self, entry: str, n: int = 5) -> List[Tuple[str, str]]:
+        """
+        A method for finding the n albums whose titles best match entry, as (title, id) pairs
+        """
+        query = normalize_title(entry)
+        with self._lock:
+            if not query:
+                return list(zip(self._titles[:n], self._ids[:n]))
+
+            scored = (
+                # Titles are already normalized, so fuzzywuzzy's own preprocessing is skipped
+                (fuzz.token_set_ratio(query, self._normalized[p], full_process=False), -p)
+                for p in self._candidates(query)
+            )
+            best = heapq.nlargest(n, scored)
+            return [(self._titles[-p], self._ids[-p]) for _, p in best]
@@ -1,11 +1,13 @@
 import math
 import os
 import readline
-from typing import Any, List
+from typing import Any, Dict, List, Optional
 from attrs import asdict
 from pyfiglet import Figlet
+from clients import GooglePhotosClient
 from utils.navigation import (
     MenuNavigationCodes,
+    MenuNavigationUserCommands,
     menuNavigationUserCommandsToCodes,
 )
 
@@ -71,6 +73,41 @@ def get_input(msg: str = "Input", default: str = None) -> str:
     return input(f"{msg}: ")
 
 
+def select_album(google_photos_client: GooglePhotosClient, entry: str) -> Optional[Dict]:
+    """
+    Returns the Google Photos album named entry, or lets the user pick from the closest matching
+    album names if there isn't one.  Returns None if the user goes back or nothing matched.
+    """
+    if (album := google_photos_client.get_album_by_title(entry)) is not None:
+        print(f"Using album {album['title']}")
+        return album
+
+    # Fuzzy match input against existing Google Photos albums.  Albums keep loading from Google
+    # Photos in the background, so only those loaded so far are matched.
+    suggestions = google_photos_client.get_album_suggestions(entry, 5)
+    if (error := google_photos_client.listing_error()) is not None:
+        if not suggestions:
+            raise error
+        print(f"Listing albums failed ({error}), only matched against the albums loaded so far")
+    elif not google_photos_client.done:
+        print("Still loading albums, only matched against the albums loaded so far")
+
+    if not suggestions:
+        print("No albums found")
+        return None
+
+    print()
+
+    print_single_list([sug[0] for sug in suggestions])
+
+    print()
+    sel = get_selection(1, len(suggestions), [MenuNavigationUserCommands.GO_BACK])
+    if sel < 1:
+        return None
+
+    return google_photos_client.get_album_info(suggestions[sel - 1][1])
+
+
 def ask_yes_no_question(text: str) -> bool:
     """
     Prompts the user to answer a provided question and then checks if the
@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import IO, Callable, Dict, Iterable, List, Optional, Union
+
+from utils.photo_processing import EncoderProfile, Rendition, render_buffer
+from utils.threading import ByteBudget, WorkerPool
+from utils.throttling import ConcurrencyLimiter
+
+# How much decoded image data may be in flight across all the photos being processed
+DEFAULT_MEMORY_BUDGET_BYTES = 1536 * 1024 * 1024
+
+
+def _render_shared(
+    name: str, size: int, sizes: List[int], profile: EncoderProfile
+) -> Dict[int, Rendition]:
+    """
+    Runs in a worker process: renders an image whose encoded bytes the parent left in a shared
+    memory block, decoding it straight out of the block rather than from a copy
+    """
+    shm = SharedMemory(name=name)
+    try:
+        # The reader releases its view of the block once the image is rendered, which has to
+        # happen before the block can be closed
+        return render_buffer(shm.buf[:size], sizes, profile)  # type: ignore[index]
+    finally:
+        shm.close()
+
+
+class HybridExecutor:
+    """
+    Runs blocking network calls (Google Photos, S3, DynamoDB) on a thread pool and the CPU bound
+    image work (decode, resize, encode, hash) on a process pool, so image work isn't serialized
+    by the GIL and scales with the number of cores.
+
+    Downloaded photos are handed to the worker processes through shared memory rather than
+    being pickled through a pipe.  The renditions coming back are already encoded and much
+    smaller, so they're returned normally.
+
+    How many downloads, uploads and DynamoDB writes actually run at once is decided by a
+    ConcurrencyLimiter per stage, the thread pool only needs to be as large as their maximum.
+    Photos reserve their decoded size from `memory_budget` before they're downloaded, so large
+    photos leave fewer others in flight.
+    """
+
+    COPY_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(
+        self,
+        io_workers: int = ConcurrencyLimiter.DEFAULT_MAXIMUM,
+        cpu_workers: Optional[int] = None,
+        memory_budget: int = DEFAULT_MEMORY_BUDGET_BYTES,
+    ):
+        self.io_workers = io_workers
+        self.cpu_workers = cpu_workers or os.cpu_count() or 1
+        self.memory_budget = ByteBudget(memory_budget)
+        self.download_limiter = ConcurrencyLimiter("download", maximum=io_workers)
+        self.upload_limiter = ConcurrencyLimiter("upload", maximum=io_workers)
+        self.write_limiter = ConcurrencyLimiter("write", maximum=io_workers)
+        self._io_pool = ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="io")
+        # Forking a process that's running threads can deadlock the child, so workers are spawned
+        self._cpu_pool = ProcessPoolExecutor(
+            max_workers=self.cpu_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def __enter__(self) -> "HybridExecutor":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+
+    @property
+    def limiters(self) -> List[ConcurrencyLimiter]:
+        return [self.download_limiter, self.upload_limiter, self.write_limiter]
+
+    def submit_io(self, fn: Callable, *args, **kwargs) -> Future:
+        return self._io_pool.submit(fn, *args, **kwargs)
+
+    def worker_pool(
+        self, fn: Callable, on_progress: Optional[Callable[[WorkerPool], None]] = None
+    ) -> WorkerPool:
+        """
+        A method for creating a WorkerPool whose workers run on the I/O threads, rather than on
+        a second set of threads as large as them
+        """
+        return WorkerPool(
+            fn, workers=self.io_workers, on_progress=on_progress, executor=self._io_pool
+        )
+
+    def submit_render(
+        self, data: Union[bytes, IO[bytes]], sizes: Iterable[int], profile: EncoderProfile
+    ) -> "Future[Dict[int, Rendition]]":
+        """
+        A method for rendering an encoded image, given as bytes or a file, at each max size on
+        the process pool
+        """
+        if isinstance(data, bytes):
+            size = len(data)
+            shm = SharedMemory(create=True, size=max(size, 1))
+            shm.buf[:size] = data  # type: ignore[index]
+        else:
+            # Copy the file straight into shared memory rather than reading it into bytes first
+            size = data.seek(0, os.SEEK_END)
+            data.seek(0)
+            shm = SharedMemory(create=True, size=max(size, 1))
+            received = 0
+            while chunk := data.read(self.COPY_CHUNK_SIZE):
+                shm.buf[received : received + len(chunk)] = chunk  # type: ignore[index]
+                received += len(chunk)
+
+        def release(_: Future) -> None:
+            shm.close()
+            shm.unlink()
+
+        try:
+            future = self._cpu_pool.submit(_render_shared, shm.name, size, list(sizes), profile)
+        except BaseException:
+            release(Future())
+            raise
+        future.add_done_callback(release)
+        return future
+
+    def render(
+        self, data: Union[bytes, IO[bytes]], sizes: Iterable[int], profile: EncoderProfile
+    ) -> Dict[int, Rendition]:
+        """
+        A method for rendering an image on the process pool and waiting for the result, for use
+        from the I/O threads
+        """
+        return self.submit_render(data, sizes, profile).result()
+
+    def shutdown(self) -> None:
+        self._io_pool.shutdown(wait=True)
+        self._cpu_pool.shutdown(wait=True)
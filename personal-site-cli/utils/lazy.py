@@ -0,0 +1,26 @@
+import threading
+from typing import Any, Callable, Optional
+
+
+class Lazy:
+    """
+    A stand-in for a client that is only created the first time one of its attributes is used,
+    so clients that contact a service when they're created cost nothing unless they're needed
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        self._factory = factory
+        self._obj: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    @property
+    def created(self) -> bool:
+        return self._obj is not None
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for attributes Lazy doesn't have itself, i.e. the client's
+        if self._obj is None:
+            with self._lock:
+                if self._obj is None:
+                    self._obj = self._factory()
+        return getattr(self._obj, name)
@@ -0,0 +1,50 @@
+import threading
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+
+class MediaItemIndex:
+    """
+    A lookup of the Google Photos media items that already have a Photo record, built from the
+    photo_id, filename and creation_timestamp stored on each record.  An album listing can be
+    diffed against it before anything is downloaded.
+
+    Media items are matched by id, and by (filename, creationTime) so that a photo that was
+    deleted and uploaded again under a new id isn't synced twice.
+    """
+
+    def __init__(self, photos: Iterable[Dict[str, Any]] = ()):
+        self._lock = threading.Lock()
+        self._ids: Set[str] = set()
+        self._files: Set[Tuple[str, str]] = set()
+        for photo in photos:
+            self.add(
+                photo.get("photo_id", ""),
+                photo.get("filename", ""),
+                photo.get("creation_timestamp", ""),
+            )
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def add(self, photo_id: str, filename: str = "", creation_timestamp: str = "") -> None:
+        with self._lock:
+            if photo_id:
+                self._ids.add(photo_id)
+            if filename and creation_timestamp:
+                self._files.add((filename, creation_timestamp))
+
+    def contains(self, media_item: Dict[str, Any]) -> bool:
+        """
+        A method for checking whether a media item from the Google Photos API has been synced
+        """
+        with self._lock:
+            if media_item["id"] in self._ids:
+                return True
+            key = (media_item.get("filename", ""), media_item["mediaMetadata"]["creationTime"])
+            return key in self._files
+
+    def missing(self, media_items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        A method for filtering an album listing down to the media items that haven't been synced
+        """
+        return [media_item for media_item in media_items if not self.contains(media_item)]
@@ -1,31 +1,81 @@
 import hashlib as hl
 import io
+from typing import Any, Dict, Iterable, Optional
 
-import requests
+from attrs import frozen
 from PIL import Image
 
 THUMBNAIL_MAX_SIZE = 512
 PHOTO_MAX_SIZE = 2048
-IMAGE_TYPE = "png"
 
+# Decoded photos are counted as RGBA, which also leaves room for the smaller renditions that are
+# held alongside the photo while it's being resized
+DECODED_BYTES_PER_PIXEL = 4
 
-def download_image(url: str) -> Image.Image:
-    r: requests.Response = requests.get(url)
-    r.raw.decode_content = True  # handle spurious Content-Encoding
+# Resampling from at least this many times the target size first shrinks the image by an integer
+# factor with Image.reduce, which is much cheaper and visually indistinguishable
+REDUCING_GAP = 3.0
 
-    # Save the file contents to a variable
-    content = r.content
 
-    return Image.open(io.BytesIO(content))
+@frozen()
+class EncoderProfile:
+    """
+    How images are written out: the Pillow format and its settings, plus the
+    file extension and Content-Type they're stored in S3 with
+    """
+
+    format: str
+    extension: str
+    content_type: str
+    quality: Optional[int] = None
+    progressive: bool = False
+    # Drops EXIF, which includes where the photo was taken.  The ICC profile is
+    # kept since colors are rendered wrong without it.
+    strip_metadata: bool = True
+
+    def save_kwargs(self, image: Image.Image) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {"optimize": True}
+        if self.quality is not None:
+            kwargs["quality"] = self.quality
+        if self.progressive:
+            kwargs["progressive"] = True
+        if image.info.get("icc_profile"):
+            kwargs["icc_profile"] = image.info["icc_profile"]
+        if not self.strip_metadata and image.info.get("exif"):
+            kwargs["exif"] = image.info["exif"]
+        return kwargs
+
 
+# Lossless, for logos and other graphics
+PNG_PROFILE = EncoderProfile(format="PNG", extension="png", content_type="image/png")
+JPEG_PROFILE = EncoderProfile(
+    format="JPEG", extension="jpg", content_type="image/jpeg", quality=85, progressive=True
+)
+WEBP_PROFILE = EncoderProfile(
+    format="WEBP", extension="webp", content_type="image/webp", quality=82
+)
 
-def save_image_to_buffer(image: Image.Image, image_format=IMAGE_TYPE) -> io.BytesIO:
+
+@frozen()
+class Rendition:
+    max_size: int
+    width: int
+    height: int
+    buffer: io.BytesIO
+    hsh: str
+
+
+def save_image_to_buffer(image: Image.Image, profile: EncoderProfile = PNG_PROFILE) -> io.BytesIO:
     """
-    Writes a Pillow Image to a buffer and returns the buffer
+    Writes a Pillow Image to a buffer using an encoder profile and returns the buffer
     """
+    if profile.format == "JPEG" and image.mode not in ("RGB", "L"):
+        # JPEG has no alpha channel or palette
+        image = image.convert("RGB")
+
     buffer = io.BytesIO()
     # Save the image back out to a buffer and repoint the buffer back to the beginning
-    image.save(buffer, image_format)
+    image.save(buffer, profile.format, **profile.save_kwargs(image))
     buffer.seek(0)
     return buffer
 
@@ -36,16 +86,48 @@ def rescale_image(image: Image.Image, max_size: int) -> Image.Image:
     the width of the image are larger than the specified max
     """
     width, height = image.size
-    ratio = width / height
+    scale = max_size / max(width, height)
+    if scale >= 1:
+        return image
 
-    if width <= max_size and height <= max_size:
-        pass
-    elif ratio > 1:
-        image = image.resize((max_size, int(max_size / ratio)))
-    elif ratio < 1:
-        image = image.resize((int(max_size * ratio), max_size))
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return image.resize(size, reducing_gap=REDUCING_GAP)
 
-    return image
+
+def render_image(
+    image: Image.Image, sizes: Iterable[int], profile: EncoderProfile = PNG_PROFILE
+) -> Dict[int, Rendition]:
+    """
+    Decodes an Image once and builds a rendition for each max size, keyed
+    by size.  Renditions are made largest first, each one downscaled from
+    the one before it rather than from the original.  JPEG sources are
+    decoded straight at a reduced scale when the largest size allows it.
+    """
+    ordered = sorted(set(sizes), reverse=True)
+
+    if image.format == "JPEG":
+        # Lets libjpeg skip the detail we'd throw away, the result is never
+        # smaller than the requested size
+        image.draft(None, (ordered[0], ordered[0]))
+
+    renditions = {}
+    for size in ordered:
+        scaled = rescale_image(image, size)
+        if scaled is not image:
+            # Each step only needs the one before it, so larger images are freed right away
+            image.close()
+            image = scaled
+        buffer = save_image_to_buffer(image, profile)
+        renditions[size] = Rendition(
+            max_size=size,
+            width=image.width,
+            height=image.height,
+            buffer=buffer,
+            hsh=hash_buffer_md5(buffer),
+        )
+
+    image.close()
+    return renditions
 
 
 def hash_buffer_md5(buffer: io.BytesIO) -> str:
@@ -54,3 +136,65 @@ def hash_buffer_md5(buffer: io.BytesIO) -> str:
     """
     md5 = hl.md5(buffer.getbuffer())
     return md5.hexdigest()
+
+
+def estimate_decoded_bytes(width: int, height: int, max_size: Optional[int] = None) -> int:
+    """
+    Estimates the memory a photo needs once decoded, when it's downloaded
+    at no more than max_size x max_size
+    """
+    if max_size:
+        scale = min(1.0, max_size / max(width, height, 1))
+        width, height = round(width * scale), round(height * scale)
+    return width * height * DECODED_BYTES_PER_PIXEL
+
+
+class BufferReader(io.RawIOBase):
+    """
+    A read-only file over a memoryview, so an image can be decoded straight out of a buffer such
+    as a shared memory block without copying the whole buffer first (io.BytesIO would).  Closing
+    the reader releases its view of the buffer.
+    """
+
+    def __init__(self, view: memoryview):
+        self._view = view
+        self._pos = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b: Any) -> int:
+        n = max(0, min(len(b), len(self._view) - self._pos))
+        b[:n] = self._view[self._pos : self._pos + n]
+        self._pos += n
+        return n
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_CUR:
+            offset += self._pos
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self) -> int:
+        return self._pos
+
+    def close(self) -> None:
+        self._view.release()
+        super().close()
+
+
+def render_buffer(
+    view: memoryview, sizes: Iterable[int], profile: EncoderProfile = PNG_PROFILE
+) -> Dict[int, Rendition]:
+    """
+    Decodes an encoded image straight out of a buffer and renders it at each max size, see
+    render_image.  The pixels have all been loaded by the time it returns, so the buffer can be
+    freed then.
+    """
+    with io.BufferedReader(BufferReader(view)) as reader:
+        return render_image(Image.open(reader), sizes, profile)
@@ -1,7 +1,241 @@
-import numpy as np
+import queue
+import threading
+import time
+from concurrent.futures import Executor, Future, wait
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from attrs import define
 
 THREADS = 8
 
 
-def split(lst, n):
-    return np.array_split(lst, n)
+@define()
+class WorkResult:
+    index: int
+    item: Any
+    result: Any = None
+    error: Optional[BaseException] = None
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class WorkerPool:
+    """
+    A pool of threads pulling items one at a time from a shared queue, so a few slow items hold
+    up a single worker each rather than a whole pre-assigned chunk.  Items can be submitted while
+    the pool is running, every item's result or error is kept, and `on_progress` is called with
+    the pool after each item finishes.
+
+    The workers run on their own threads, or on an executor's threads if one is given.
+    """
+
+    _STOP = object()
+
+    def __init__(
+        self,
+        fn: Callable[[Any], Any],
+        workers: int = THREADS,
+        on_progress: Optional[Callable[["WorkerPool"], None]] = None,
+        executor: Optional[Executor] = None,
+    ):
+        self.fn = fn
+        self.workers = workers
+        self.on_progress = on_progress
+
+        self._queue: queue.Queue = queue.Queue()
+        self._lock = threading.Lock()
+        # Keeps progress reports from different workers from interleaving
+        self._progress_lock = threading.Lock()
+        self._results: List[WorkResult] = []
+        self._in_flight: Dict[int, Any] = {}
+        self._submitted = 0
+        self._failed = 0
+        self.progress_error: Optional[BaseException] = None
+        self.started = time.monotonic()
+
+        self._threads: List[threading.Thread] = []
+        self._futures: List[Future] = []
+        if executor is not None:
+            self._futures = [executor.submit(self._work) for _ in range(workers)]
+        else:
+            self._threads = [
+                threading.Thread(target=self._work, name=f"worker-{i}", daemon=True)
+                for i in range(workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+
+    def __enter__(self) -> "WorkerPool":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def total(self) -> int:
+        return self._submitted
+
+    @property
+    def completed(self) -> int:
+        return len(self._results)
+
+    @property
+    def failed(self) -> int:
+        return self._failed
+
+    def in_flight(self) -> Dict[int, Any]:
+        """
+        A method for retrieving the items being worked on right now, by submission index
+        """
+        with self._lock:
+            return dict(self._in_flight)
+
+    def _work(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is self._STOP:
+                return
+
+            index, item = entry
+            with self._lock:
+                self._in_flight[index] = item
+
+            started = time.monotonic()
+            result = WorkResult(index=index, item=item)
+            try:
+                result.result = self.fn(item)
+            except Exception as e:
+                result.error = e
+            result.seconds = time.monotonic() - started
+
+            with self._lock:
+                del self._in_flight[index]
+                self._results.append(result)
+                if result.error is not None:
+                    self._failed += 1
+
+            if self.on_progress:
+                try:
+                    with self._progress_lock:
+                        self.on_progress(self)
+                except Exception as e:
+                    # A failed progress report mustn't stop the worker, close() waits on it
+                    self.progress_error = e
+
+    def submit(self, item: Any) -> int:
+        """
+        A method for queueing an item, returns its submission index
+        """
+        with self._lock:
+            index = self._submitted
+            self._submitted += 1
+        self._queue.put((index, item))
+        return index
+
+    def close(self) -> List[WorkResult]:
+        """
+        A method for waiting until every submitted item is done, returns the results in
+        submission order
+        """
+        for _ in range(self.workers):
+            self._queue.put(self._STOP)
+        for thread in self._threads:
+            thread.join()
+        wait(self._futures)
+
+        with self._lock:
+            return sorted(self._results, key=lambda result: result.index)
+
+    def map(self, items: Iterable[Any]) -> List[WorkResult]:
+        """
+        A method for submitting every item and waiting for the results.  items can be a lazy
+        iterator, if it raises, the items already submitted are still finished before the error
+        is re-raised.
+        """
+        try:
+            for item in items:
+                self.submit(item)
+        finally:
+            results = self.close()
+        return results
+
+
+class ClaimSet:
+    """
+    A thread-safe set whose `claim` adds an item and reports whether it was new, so of several
+    threads holding the same item exactly one goes on to handle it
+    """
+
+    def __init__(self, items: Iterable[Any] = ()):
+        self._items = set(items)
+        self._lock = threading.Lock()
+
+    def __contains__(self, item: Any) -> bool:
+        with self._lock:
+            return item in self._items
+
+    def claim(self, item: Any) -> bool:
+        with self._lock:
+            if item in self._items:
+                return False
+            self._items.add(item)
+            return True
+
+
+class ByteBudget:
+    """
+    A semaphore counted in bytes rather than items, so that how much work is in flight depends on
+    how much memory it needs.  A reservation larger than the whole budget waits until nothing
+    else is reserved and then runs on its own.
+
+    Reservations are granted in the order they're asked for, so a large one isn't starved by a
+    stream of small ones that keep fitting ahead of it.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_use = 0
+        self.peak = 0
+        self.waits = 0
+        self._cond = threading.Condition()
+        # Each acquire takes a ticket and is granted once every earlier ticket has been
+        self._next_ticket = 0
+        self._serving = 0
+
+    def acquire(self, nbytes: int) -> int:
+        nbytes = min(nbytes, self.capacity)
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+
+            def granted() -> bool:
+                return self._serving == ticket and self.in_use + nbytes <= self.capacity
+
+            if not granted():
+                self.waits += 1
+            while not granted():
+                self._cond.wait()
+
+            self._serving += 1
+            self.in_use += nbytes
+            self.peak = max(self.peak, self.in_use)
+            # The next ticket may fit in what's left
+            self._cond.notify_all()
+        return nbytes
+
+    def release(self, nbytes: int) -> None:
+        with self._cond:
+            self.in_use -= nbytes
+            self._cond.notify_all()
+
+    @contextmanager
+    def reserve(self, nbytes: int) -> Iterator[None]:
+        acquired = self.acquire(nbytes)
+        try:
+            yield
+        finally:
+            self.release(acquired)
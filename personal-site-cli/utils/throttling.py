@@ -0,0 +1,171 @@
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from botocore.exceptions import ClientError
+from exceptions import DynamoDBThrottlingException
+
+T = TypeVar("T")
+
+THROTTLING_ERROR_CODES = {
+    "ProvisionedThroughputExceededException",
+    "ThrottlingException",
+    "Throttling",
+    "RequestLimitExceeded",
+    "TooManyRequestsException",
+    "SlowDown",
+}
+THROTTLING_STATUS_CODES = {429, 503}
+
+
+def is_throttling_error(e: BaseException) -> bool:
+    """
+    A function for checking whether an AWS, requests or Google API error means the service is
+    asking us to slow down
+    """
+    if isinstance(e, DynamoDBThrottlingException):
+        return True
+
+    if isinstance(e, ClientError):
+        return e.response["Error"]["Code"] in THROTTLING_ERROR_CODES
+
+    # requests.HTTPError has response.status_code, googleapiclient's HttpError has resp.status
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    if status is None:
+        status = getattr(getattr(e, "resp", None), "status", None)
+    return status in THROTTLING_STATUS_CODES
+
+
+class ConcurrencyLimiter:
+    """
+    An AIMD limit on how many calls to a service run at once, shared by the threads of a pipeline
+    stage.  While calls succeed and the limit is being used, it grows by about one call per round
+    of calls.  When a call is throttled the limit is cut in half and the call is retried after a
+    jittered backoff.
+
+    Latency isn't treated as a congestion signal, because the calls through one limiter vary in
+    size (thumbnails and full renditions, 1 and 25 item batches) and slow calls would be mistaken
+    for congestion.
+    """
+
+    DEFAULT_INITIAL = 8
+    DEFAULT_MAXIMUM = 32
+    DECREASE_FACTOR = 0.5
+    LATENCY_SMOOTHING = 0.2
+
+    def __init__(
+        self,
+        name: str,
+        initial: int = DEFAULT_INITIAL,
+        minimum: int = 1,
+        maximum: int = DEFAULT_MAXIMUM,
+        max_retries: int = 5,
+        base_backoff: float = 0.1,
+        max_backoff: float = 10.0,
+    ):
+        self.name = name
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._limit = float(initial)
+        self._in_flight = 0
+        self._latency: Optional[float] = None
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+        self.calls = 0
+        self.errors = 0
+        self.throttled = 0
+        self.increases = 0
+        self.decreases = 0
+
+    @property
+    def limit(self) -> int:
+        return max(self.minimum, int(self._limit))
+
+    def _acquire(self) -> None:
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def _decrease(self) -> None:
+        # At most one decrease per round trip, so one burst of slow calls doesn't collapse the limit
+        now = time.monotonic()
+        if now - self._last_decrease < (self._latency or 0.0):
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.minimum), self._limit * self.DECREASE_FACTOR)
+        self.decreases += 1
+
+    def _on_success(self, seconds: float) -> None:
+        with self._cond:
+            saturated = self._in_flight >= self.limit
+            self._in_flight -= 1
+            self.calls += 1
+
+            self._latency = (
+                seconds
+                if self._latency is None
+                else self._latency + self.LATENCY_SMOOTHING * (seconds - self._latency)
+            )
+
+            if saturated and self._limit < self.maximum:
+                # Additive increase: +1 once every `limit` successful calls
+                before = self.limit
+                self._limit = min(float(self.maximum), self._limit + 1 / self._limit)
+                if self.limit > before:
+                    self.increases += 1
+
+            self._cond.notify_all()
+
+    def _on_error(self, throttled: bool) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            if throttled:
+                self.throttled += 1
+                self._decrease()
+            else:
+                self.errors += 1
+            self._cond.notify_all()
+
+    def call(self, fn: Callable[..., T], *args, **kwargs) -> T:
+        """
+        A method for running fn once a slot is free, retrying it with jittered exponential
+        backoff if the service throttles it
+        """
+        attempt = 0
+        while True:
+            self._acquire()
+            started = time.monotonic()
+            try:
+                result = fn(*args, **kwargs)
+            except Exception as e:
+                throttled = is_throttling_error(e)
+                self._on_error(throttled)
+                if not throttled or attempt >= self.max_retries:
+                    raise
+                time.sleep(random.uniform(0, min(self.max_backoff, self.base_backoff * 2**attempt)))
+                attempt += 1
+                continue
+
+            self._on_success(time.monotonic() - started)
+            return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "name": self.name,
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "calls": self.calls,
+                "errors": self.errors,
+                "throttled": self.throttled,
+                "increases": self.increases,
+                "decreases": self.decreases,
+                "latency": self._latency,
+            }